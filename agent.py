@@ -1,23 +1,149 @@
 import time
 from datetime import datetime, timedelta
 import pyautogui
+from PIL import Image
 import os
-from langchain.chat_models import ChatOpenAI
+import sys
+# llm_client.py lives in server/, whose modules import it as a top-level
+# module; import it the same way so a process with both shares one client
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server")
+if SERVER_DIR not in sys.path:
+    sys.path.append(SERVER_DIR)
+from llm_client import shared_client
 from pydantic import BaseModel, Field, validator
-from langchain.output_parsers import PydanticOutputParser
 from typing import Optional, Literal, List, Dict
 from enum import Enum
 import platform
 import subprocess
 import json
-from collections import deque
+from collections import deque, defaultdict, OrderedDict
 import base64
+import io
 import subprocess
 import re
+import queue
+import threading
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from rule_filter import CompiledCondition, count_tokens
+
+class ScreenshotSettings(BaseModel):
+    """How screenshots are shrunk before they are sent to the LLM"""
+    max_dimension: int = Field(1280, description="Longest side in pixels after downscaling")
+    image_format: Literal["JPEG", "WEBP", "PNG"] = Field("JPEG", description="Encoding format")
+    quality: int = Field(70, description="JPEG/WebP quality (1-100)")
+    grayscale: bool = Field(False, description="Drop color to save more bytes")
+
+
+def encode_image(image, settings: ScreenshotSettings):
+    """Downscale and compress a PIL image in memory. Returns (base64 data, mime type)."""
+    # Downscale first so the color conversion runs on the small image
+    scale = settings.max_dimension / max(image.size)
+    if scale < 1:
+        size = (round(image.width * scale), round(image.height * scale))
+        image = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    image = image.convert("L" if settings.grayscale else "RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format=settings.image_format, quality=settings.quality)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8'), f"image/{settings.image_format.lower()}"
+
+def dhash(image, hash_size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a tiny grayscale copy"""
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+class ChangeGate:
+    """Skip the LLM call when the screen, app and stress level haven't meaningfully changed"""
+    def __init__(self, threshold: int = 6, max_consecutive_skips: int = 12):
+        # Hamming distance between screen hashes (out of 64 bits) that counts as a change
+        self.threshold = threshold
+        # Call anyway after this many skips so time-based rules are still checked
+        self.max_consecutive_skips = max_consecutive_skips
+        self.last: Optional[Dict] = None
+        self.consecutive_skips = 0
+        self.calls = 0
+        self.skipped = 0
+    
+    def should_call(self, observation: Dict) -> bool:
+        if (
+            self.last is None
+            or observation["current_activity"] != self.last["current_activity"]
+            or observation["stress_level"] != self.last["stress_level"]
+            or (observation["screen_hash"] ^ self.last["screen_hash"]).bit_count() > self.threshold
+            or self.consecutive_skips >= self.max_consecutive_skips
+        ):
+            self.consecutive_skips = 0
+            self.calls += 1
+            return True
+        self.consecutive_skips += 1
+        self.skipped += 1
+        return False
+    
+    def record(self, observation: Dict):
+        """Remember the observation the LLM last saw"""
+        self.last = observation
+
+
+class ResponseCache:
+    """Reuse the LLM's decision when the same situation comes up again within `ttl` seconds"""
+    def __init__(self, ttl: float = 120.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.llm_ms = 0.0
+        self.saved_ms = 0.0
+    
+    @staticmethod
+    def key(observation: Dict, candidates: tuple, rules_version: int) -> tuple:
+        """Normalized situation: app, stress level, coarse screen hash, and which rules apply"""
+        return (
+            observation["current_activity"].strip().lower(),
+            observation["stress_level"].strip(),
+            observation["screen_bucket"],
+            rules_version,
+            candidates
+        )
+    
+    def get(self, key: tuple):
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] < time.monotonic():
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        # Each hit saves about one average LLM round trip
+        self.saved_ms += self.llm_ms / self.misses if self.misses else 0.0
+        return entry[0]
+    
+    def put(self, key: tuple, response, latency_ms: float):
+        self.llm_ms += latency_ms
+        self.entries[key] = (response, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_ms": self.saved_ms
+        }
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
 
 class MonitoringRule(BaseModel):
     """Structure for a custom monitoring rule"""
@@ -125,38 +251,223 @@ class ActionHistory:
     """Track history of actions taken"""
     def __init__(self, max_size=50):
         self.actions: deque = deque(maxlen=max_size)
+        self.latency = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "timeouts": 0, "errors": 0})
+        self._lock = threading.Lock()
     
-    def add_action(self, action: MonitorAction):
-        self.actions.append({
+    def add_action(self, action: MonitorAction, status: str = "done") -> Dict:
+        entry = {
             "time": datetime.now().strftime("%H:%M"),
             "action_type": action.action_type,
             "value": action.value,
-            "reasoning": action.reasoning
-        })
+            "reasoning": action.reasoning,
+            "status": status,
+            "latency_ms": None
+        }
+        with self._lock:
+            self.actions.append(entry)
+        return entry
+    
+    def complete_action(self, entry: Dict, status: str, latency_ms: float):
+        """Record how a queued action finished and how long it took"""
+        with self._lock:
+            entry["status"] = status
+            entry["latency_ms"] = round(latency_ms, 1)
+            stats = self.latency[entry["action_type"]]
+            stats["count"] += 1
+            stats["total_ms"] += latency_ms
+            stats["max_ms"] = max(stats["max_ms"], latency_ms)
+            if status == "timeout":
+                stats["timeouts"] += 1
+            elif status == "error":
+                stats["errors"] += 1
+    
+    def get_latency_stats(self) -> Dict:
+        """Average and max latency per action type"""
+        with self._lock:
+            return {
+                action_type.value: {**stats, "avg_ms": stats["total_ms"] / stats["count"]}
+                for action_type, stats in self.latency.items() if stats["count"]
+            }
     
     def get_recent_actions(self, count: int = 5) -> List[Dict]:
-        return list(self.actions)
+        with self._lock:
+            return [dict(entry) for entry in self.actions]
+
+
+# Per action type: (how many may run at once, timeout in seconds)
+ACTION_LIMITS = {
+    ActionType.ORDER_FOOD: (1, 30),
+    ActionType.TEXT_FRIEND: (1, 10),
+    ActionType.MASSAGE: (1, 5),
+    ActionType.MUSIC: (1, 10),
+    ActionType.NOTIFICATION: (4, 5),
+}
+DEFAULT_ACTION_LIMIT = (2, 10)
+
+
+class ActionExecutor:
+    """
+    Run actions off the monitoring loop. Each action type has its own bounded
+    queue and as many workers as it may run at once, so a burst of a slow
+    type (ORDER_FOOD, TEXT_FRIEND) only delays more of the same type.
+    """
+    def __init__(self, run_action, action_history: ActionHistory, max_queue: int = 20):
+        self.run_action = run_action
+        self.action_history = action_history
+        self.queues = {}
+        self.limits = {}
+        for action_type in ActionType:
+            concurrency, _ = ACTION_LIMITS.get(action_type, DEFAULT_ACTION_LIMIT)
+            self.queues[action_type] = queue.Queue(maxsize=max_queue)
+            self.limits[action_type] = threading.BoundedSemaphore(concurrency)
+            for _ in range(concurrency):
+                threading.Thread(target=self.worker, args=(action_type,), daemon=True).start()
+        # Actions run here so a worker can stop waiting on one that hangs
+        self.runner = ThreadPoolExecutor(max_workers=sum(
+            ACTION_LIMITS.get(action_type, DEFAULT_ACTION_LIMIT)[0] for action_type in ActionType))
+    
+    def submit(self, action: MonitorAction) -> bool:
+        """Queue an action without waiting for it. Returns False if its type's queue is full."""
+        entry = self.action_history.add_action(action, status="queued")
+        try:
+            self.queues[action.action_type].put_nowait((action, entry, time.perf_counter()))
+            return True
+        except queue.Full:
+            print(f"Action queue full, dropping {action.action_type}")
+            self.action_history.complete_action(entry, "dropped", 0.0)
+            return False
+    
+    def worker(self, action_type: ActionType):
+        _, timeout = ACTION_LIMITS.get(action_type, DEFAULT_ACTION_LIMIT)
+        limit = self.limits[action_type]
+        while True:
+            action, entry, queued_at = self.queues[action_type].get()
+            # Only waits if an action of this type we gave up on is still running
+            if not limit.acquire(timeout=timeout):
+                self.action_history.complete_action(entry, "timeout", (time.perf_counter() - queued_at) * 1000)
+                continue
+            entry["status"] = "running"
+            future = self.runner.submit(self.run_action, action)
+            # Only free the slot once the action really finishes, even if we
+            # stop waiting on it
+            future.add_done_callback(lambda _: limit.release())
+            try:
+                future.result(timeout=timeout)
+                status = "done"
+            except FutureTimeoutError:
+                print(f"Action {action.action_type} timed out after {timeout}s")
+                status = "timeout"
+            except Exception as e:
+                print(f"Error executing {action.action_type}: {e}")
+                status = "error"
+            self.action_history.complete_action(entry, status, (time.perf_counter() - queued_at) * 1000)
+
+
+# The static part of the monitoring prompt comes first so it is identical
+# across cycles (and can be cached by the provider); it is rendered once per
+# rules change and set of candidate rules. Only MONITOR_PROMPT_STATE is
+# filled in every cycle.
+MONITOR_PROMPT_PREFIX = """
+        You are a helpful monitoring assistant.
+        
+        MONITORING RULES TO FOLLOW:
+        {monitoring_rules}
+        
+        Your job is to check if any of the monitoring rules apply to the current situation and its history.
+        If they do, choose appropriate actions from the rule's action list, if any actions are required. remember, you do not always need to do an action. Only take an action if the monitoring rules explicitly align with what the user is currently doing.
+        
+        Available Action Types:
+        - SET_WEBSITE: <the url of the website to change the current tab to>
+        - CLOSE_TAB: <closes current tab>
+        - ORDER_FOOD: <dish to order and restaurant to order from>
+        - TEXT_FRIEND: <the phone number and message to text in the form: number|message>
+        - MATCHA: <opens the Ekkomi matcha website>
+        - MASSAGE: <prescribes a massage>
+        - MUSIC: <jazz/lofi/pop>
+        - NOTIFICATION: <text of notification to user>
+        - BRIGHTNESS: <brightness 1-100>
+        - COLOR: <kelvin of screen temperature>
+        
+        You can recommend multiple actions if needed. For example:
+        {{
+            "actions": [
+                {{"action_type": "NOTIFICATION", "value": "Time for nice music", "reasoning": "Been working for 2 hours"}},
+                {{"action_type": "MUSIC", "value": "lofi", "reasoning": "Help wind down"}},
+                {{"action_type": "SET_WEBSITE", "value": "https://youtu.be/s9M30w085SY", "reasoning": "more educational content/'"}}
+            ],
+            "analysis": "User has been working intensely and needs music"
+        }}
+        """
+
+MONITOR_PROMPT_STATE = """
+        Based on the following information:
+        
+        Current Time: {time}
+        Current Stress Level: {stress_level}
+        Current App: {current_activity}
+        
+        Recent Activity History (last hour):
+        {recent_activities}
+        
+        Recent Actions Taken:
+        {recent_actions}
+        
+        Do not take an action if it has been recently taken unless you have a particular reason to redo it again at this time.
+        
+        Respond with the appropriate action(s) based on the monitoring rules, or empty json if no actions are recommended:
+        """
+
 
 class StressMonitorAgent:
-    def __init__(self, openai_api_key):
-        self.llm = ChatOpenAI(
-            model_name="gpt-4o-mini",
+    def __init__(self, openai_api_key, cycle_period: float = 5.0,
+                 screenshot_settings: Optional[ScreenshotSettings] = None):
+        # Tool calling makes the model return a validated MonitorResponse
+        # instead of free-form JSON that we would have to parse ourselves
+        # Shares pooled connections, retries and latency stats with the server's chat model
+        self.llm = shared_client().chat_model(
+            model="gpt-4o-mini",
             temperature=0.7,
-            openai_api_key=openai_api_key
-        )
+            api_key=openai_api_key
+        ).with_structured_output(MonitorResponse, method="function_calling")
         
-        self.parser = PydanticOutputParser(pydantic_object=MonitorResponse)
         self.state_history = StateHistory()
         self.action_history = ActionHistory()
+        self.action_executor = ActionExecutor(self.execute_action, self.action_history)
+        # Target time between the starts of two monitoring cycles, in seconds
+        self.cycle_period = cycle_period
+        self.screenshot_settings = screenshot_settings or ScreenshotSettings()
+        self.change_gate = ChangeGate()
+        self.response_cache = ResponseCache()
+        self.cycles = 0
         self.rules_path = os.path.join("server", "rules.json")
+        self.rules_key = None
+        self.rules_version = 0
+        self.monitoring_rules: List[MonitoringRule] = []
+        self.compiled_rules: List[CompiledCondition] = []
+        # Rendered prompt prefix and its token count per set of candidate rules
+        self.prompt_prefixes: Dict[tuple, tuple] = {}
+        self.filtered = 0
         self.monitoring_rules = self.load_monitoring_rules()
 
     def load_monitoring_rules(self) -> List[MonitoringRule]:
-        """Load monitoring rules from rules.json file"""
+        """Load monitoring rules from rules.json, only re-parsing when the file changes"""
+        try:
+            stat = os.stat(self.rules_path)
+        except OSError as e:
+            print(f"Error loading rules from {self.rules_path}: {e}")
+            return []
+        rules_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if rules_key == self.rules_key:
+            return self.monitoring_rules
+        self.rules_key = rules_key
+        self.rules_version += 1
+
         rules = ""
 
-        if os.path.getsize(self.rules_path) == 0:
+        if stat.st_size == 0:
             print(f"Warning: {self.rules_path} is empty. No rules loaded.")
+            self.monitoring_rules = []
+            self.compile_rules()
             return []
 
         try:
@@ -235,60 +546,40 @@ class StressMonitorAgent:
             #     priority=2
             # ),
         ]
-        self.monitor_prompt = """
-        You are a helpful monitoring assistant. Based on the following information:
-        
-        Current Time: {time}
-        Current Stress Level: {stress_level}
-        Current App: {current_activity}
-        
-        Recent Activity History (last hour):
-        {recent_activities}
-        
-        Recent Actions Taken:
-        {recent_actions}
-        
-        Do not take an action if it has been recently taken unless you have a particular reason to redo it again at this time.
-        
-        MONITORING RULES TO FOLLOW:
-        {monitoring_rules}
-        
-        Your job is to check if any of the monitoring rules apply to the current situation and its history.
-        If they do, choose appropriate actions from the rule's action list, if any actions are required. remember, you do not always need to do an action. Only take an action if the monitoring rules explicitly align with what the user is currently doing.
-        
-        {format_instructions}
-        
-        Available Action Types:
-        - SET_WEBSITE: <the url of the website to change the current tab to>
-        - CLOSE_TAB: <closes current tab>
-        - ORDER_FOOD: <dish to order and restaurant to order from>
-        - TEXT_FRIEND: <the phone number and message to text in the form: number|message>
-        - MATCHA: <opens the Ekkomi matcha website>
-        - MASSAGE: <prescribes a massage>
-        - MUSIC: <jazz/lofi/pop>
-        - NOTIFICATION: <text of notification to user>
-        - BRIGHTNESS: <brightness 1-100>
-        - COLOR: <kelvin of screen temperature>
-        
-        You can recommend multiple actions if needed. For example:
-        {{
-            "actions": [
-                {{"action_type": "NOTIFICATION", "value": "Time for nice music", "reasoning": "Been working for 2 hours"}},
-                {{"action_type": "MUSIC", "value": "lofi", "reasoning": "Help wind down"}},
-                {{"action_type": "SET_WEBSITE", "value": "https://youtu.be/s9M30w085SY", "reasoning": "more educational content/'"}}
-            ],
-            "analysis": "User has been working intensely and needs music"
-        }}
-        
-        Respond with the appropriate action(s) based on the monitoring rules, or empty json if no actions are recommended:
-        """
+        self.monitoring_rules = rules
+        self.compile_rules()
         return rules
     
-    def format_monitoring_rules(self):
+    def compile_rules(self):
+        """Turn each rule's condition into cheap checks and drop stale prompt prefixes"""
+        self.compiled_rules = [CompiledCondition(rule.condition) for rule in self.monitoring_rules]
+        self.prompt_prefixes = {}
+    
+    def candidate_rules(self, observation: Dict) -> tuple:
+        """Indices of the rules whose conditions could apply to this observation"""
+        now = datetime.strptime(observation["time"], "%H:%M:%S").time()
+        return tuple(i for i, compiled in enumerate(self.compiled_rules)
+                     if compiled.matches(now, observation["stress_level"], observation["current_activity"]))
+    
+    def build_prompt_prefix(self, candidates: Optional[tuple] = None) -> tuple:
+        """Render the part of the prompt that only changes with the rules, with its token count"""
+        if candidates is None:
+            candidates = tuple(range(len(self.monitoring_rules)))
+        if candidates not in self.prompt_prefixes:
+            prefix = MONITOR_PROMPT_PREFIX.format(
+                monitoring_rules=self.format_monitoring_rules(candidates)
+            )
+            self.prompt_prefixes[candidates] = (prefix, count_tokens(prefix))
+        return self.prompt_prefixes[candidates]
+    
+    def format_monitoring_rules(self, candidates: Optional[tuple] = None):
         """Format monitoring rules for the prompt"""
+        if candidates is None:
+            candidates = range(len(self.monitoring_rules))
         rules_text = "MONITORING RULES:\n"
-        for i, rule in enumerate(self.monitoring_rules, 1):
-            rules_text += f"\nRule {i} (Priority {rule.priority}):\n"
+        for i in candidates:
+            rule = self.monitoring_rules[i]
+            rules_text += f"\nRule {i + 1} (Priority {rule.priority}):\n"
             rules_text += f"Watch for: {rule.condition}\n"
             rules_text += "Possible actions:\n"
             for action in rule.actions:
@@ -303,12 +594,11 @@ class StressMonitorAgent:
             priority=priority
         )
         self.monitoring_rules.append(new_rule)
+        self.compile_rules()
     
     def get_screenshot(self):
-        """Take a screenshot and save it temporarily"""
-        screenshot = pyautogui.screenshot()
-        screenshot.save("temp_screenshot.png")
-        return "temp_screenshot.png"
+        """Take a screenshot as an in-memory PIL image"""
+        return pyautogui.screenshot()
     
     def get_stress_level(self):
         """Read stress level from stress.txt"""
@@ -353,9 +643,6 @@ class StressMonitorAgent:
             self.set_brightness(action.value)
         elif action.action_type == ActionType.COLOR:
             self.set_color_temperature(action.value)
-        
-        # Record the action in history
-        self.action_history.add_action(action)
     
     def execute_set_website(self, url: str):
         """Execute computer control command"""
@@ -451,73 +738,155 @@ class StressMonitorAgent:
         # Add OS-specific color temperature control
         print(f"Setting color temperature to: {temperature}")
     
-    def monitor_loop(self):
-        """Main monitoring loop"""
+    def capture_observation(self) -> Dict:
+        """Gather the current state: screenshot, stress level and active app"""
+        current_time = datetime.now().strftime("%H:%M:%S")
+        screenshot = self.get_screenshot()
+        stress_level = self.get_stress_level()
+        current_activity = self.get_current_activity()
+        base64_image, mime_type = encode_image(screenshot, self.screenshot_settings)
+        return {
+            "time": current_time,
+            "stress_level": stress_level,
+            "current_activity": current_activity,
+            "image": base64_image,
+            "mime_type": mime_type,
+            "screen_hash": dhash(screenshot),
+            # 16-bit hash, so small screen changes land in the same cache bucket
+            "screen_bucket": dhash(screenshot, hash_size=4)
+        }
+    
+    def build_messages(self, observation: Dict, candidates: Optional[tuple] = None) -> List[Dict]:
+        """Format the prompt for one observation, with only the candidate rules"""
+        # Format the prompt with current state and histories
+        # Only the current state is substituted each cycle; the rules and
+        # format instructions are rendered once per rules change
+        prompt_prefix, _ = self.build_prompt_prefix(candidates)
+        formatted_prompt = prompt_prefix + MONITOR_PROMPT_STATE.format(
+            time=observation["time"],
+            stress_level=observation["stress_level"],
+            current_activity=observation["current_activity"],
+            recent_activities=json.dumps(self.state_history.get_recent_activities(), indent=2),
+            recent_actions=json.dumps(self.action_history.get_recent_actions(), indent=2)
+        )
+
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": formatted_prompt
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:{observation['mime_type']};base64,{observation['image']}"
+                        }
+                    },
+                ]
+            }
+        ]
+    
+    def report_tokens(self, messages: List[Dict], candidates: tuple):
+        """Print the prompt's text tokens next to what sending every rule would cost"""
+        prefix, prefix_tokens = self.build_prompt_prefix(candidates)
+        _, all_rules_tokens = self.build_prompt_prefix()
+        state_tokens = count_tokens(messages[0]["content"][0]["text"][len(prefix):])
+        print(f"Prompt: {prefix_tokens + state_tokens} tokens, "
+              f"{len(candidates)}/{len(self.monitoring_rules)} rules "
+              f"(all rules: {all_rules_tokens + state_tokens} tokens)")
+    
+    def handle_response(self, monitor_response: MonitorResponse, cached: bool = False):
+        """Queue the actions recommended by the LLM"""
+        recent = set()
+        if cached:
+            # A replayed decision shouldn't redo what it already did
+            recent = {(entry["action_type"], entry["value"]) for entry in self.action_history.get_recent_actions()}
+        
+        # Execute all recommended actions
+        print(f"Analysis: {monitor_response.analysis}" + (" (cached)" if cached else ""))
+        for action in monitor_response.actions:
+            if (action.action_type, action.value) not in recent:
+                self.action_executor.submit(action)
+        
+        latency_stats = self.action_history.get_latency_stats()
+        if latency_stats:
+            print("Action latency: " + ", ".join(
+                f"{action_type} avg {stats['avg_ms']:.0f}ms max {stats['max_ms']:.0f}ms"
+                for action_type, stats in latency_stats.items()))
+    
+    async def capture_stage(self, frames: asyncio.Queue):
+        """Capture an observation every cycle_period seconds"""
+        while True:
+            started = time.monotonic()
+            try:
+                observation = await asyncio.to_thread(self.capture_observation)
+                # Keep only the newest observation if the LLM is still busy
+                if frames.full():
+                    frames.get_nowait()
+                frames.put_nowait(observation)
+            except Exception as e:
+                print(f"Error capturing observation: {e}")
+            await asyncio.sleep(max(0.0, self.cycle_period - (time.monotonic() - started)))
+    
+    async def decide_stage(self, frames: asyncio.Queue):
+        """Send each observation to the LLM while the next one is being captured"""
         while True:
+            observation = await frames.get()
             try:
                 # Reload rules on each iteration
                 self.monitoring_rules = self.load_monitoring_rules()
                 if not self.monitoring_rules:
                     continue
                 
-                # Gather current state
-                current_time = datetime.now().strftime("%H:%M:%S")
-                screenshot_path = self.get_screenshot()
-                stress_level = self.get_stress_level()
-                current_activity = self.get_current_activity()
-                base64_image = encode_image(screenshot_path)
-                
                 # Update state history
-                self.state_history.update_state(current_activity, stress_level)
-                
-                # Format the prompt with current state and histories
-                formatted_prompt = self.monitor_prompt.format(
-                    time=current_time,
-                    stress_level=stress_level,
-                    current_activity=current_activity,
-                    recent_activities=json.dumps(self.state_history.get_recent_activities(), indent=2),
-                    recent_actions=json.dumps(self.action_history.get_recent_actions(), indent=2),
-                    monitoring_rules=self.format_monitoring_rules(),
-                    format_instructions=self.parser.get_format_instructions()
-                )
-
-                messages = [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": formatted_prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
-                            },
-                        ]
-                    }
-                ]
-
-                # Get AI recommendation with structured output
-                response = self.llm.invoke(messages)
-                monitor_response = self.parser.parse(response.content)
+                self.state_history.update_state(observation["current_activity"], observation["stress_level"])
                 
-                # Execute all recommended actions
-                print(f"Analysis: {monitor_response.analysis}")
-                for action in monitor_response.actions:
-                    self.execute_action(action)
+                # Rules whose time, stress or app checks rule them out never
+                # reach the LLM, and with no candidates there is nothing to ask
+                candidates = self.candidate_rules(observation)
+                if not candidates:
+                    self.filtered += 1
+                    print(f"Skipping LLM call, no rule applies ({self.filtered} filtered)")
+                    continue
                 
-                # Cleanup
-                if os.path.exists(screenshot_path):
-                    os.remove(screenshot_path)
+                if not self.change_gate.should_call(observation):
+                    print(f"Skipping LLM call, nothing changed "
+                          f"({self.change_gate.skipped} skipped, {self.change_gate.calls} sent)")
+                    continue
                 
-                # Wait for next check
-                time.sleep(5)
+                key = self.response_cache.key(observation, candidates, self.rules_version)
+                response = self.response_cache.get(key)
+                cached = response is not None
+                if not cached:
+                    messages = self.build_messages(observation, candidates)
+                    self.report_tokens(messages, candidates)
+                    
+                    # Get AI recommendation with structured output
+                    started = time.perf_counter()
+                    response = await self.llm.ainvoke(messages)
+                    self.response_cache.put(key, response, (time.perf_counter() - started) * 1000)
+                self.change_gate.record(observation)
+                self.handle_response(response, cached)
+                self.cycles += 1
                 
+                cache_stats = self.response_cache.stats()
+                print(f"Response cache: {cache_stats['hit_rate']:.0%} hits "
+                      f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']}), "
+                      f"saved {cache_stats['saved_ms'] / 1000:.1f}s of LLM time")
             except Exception as e:
                 print(f"Error in monitoring loop: {e}")
-                time.sleep(5)
+    
+    async def monitor_pipeline(self):
+        """Run capture and LLM stages concurrently"""
+        frames = asyncio.Queue(maxsize=1)
+        await asyncio.gather(self.capture_stage(frames), self.decide_stage(frames))
+    
+    def monitor_loop(self):
+        """Main monitoring loop"""
+        asyncio.run(self.monitor_pipeline())
+
 
 def main():
     # Initialize the agent
@@ -0,0 +1,35 @@
+"""
+Benchmarks, load tests and the stub OpenAI server, kept out of the modules
+they measure.
+
+Run them from the repository root, e.g. `python -m bench.history_store`.
+The server's modules import each other by bare name because they are run
+from server/, so the server benchmarks call use_server() before importing
+them. agent.py puts server/ on the path itself.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(ROOT, "server")
+EMG_DIR = os.path.join(ROOT, "emg")
+
+
+def use_server():
+    """
+    Makes server/'s modules importable the way server.py imports them, and
+    runs from server/ so its relative data paths (history.txt, ...) resolve.
+    """
+    if SERVER_DIR not in sys.path:
+        sys.path.insert(0, SERVER_DIR)
+    os.chdir(SERVER_DIR)
+
+
+def use_emg():
+    if EMG_DIR not in sys.path:
+        sys.path.insert(0, EMG_DIR)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
@@ -0,0 +1,69 @@
+import asyncio
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from bench import use_server
+from bench.stub_llm import start_stub
+
+use_server()
+import server  # noqa: E402
+from asgi import create_app  # noqa: E402
+from llm_client import LLMClient  # noqa: E402
+
+
+def serve_in_thread(asgi_app, port):
+    config = uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning")
+    uv_server = uvicorn.Server(config)
+    threading.Thread(target=uv_server.run, daemon=True).start()
+    while not uv_server.started:
+        time.sleep(0.05)
+    return uv_server
+
+
+def benchmark(streams=200, latency=1.0, wsgi_workers=10):
+    """
+    `streams` concurrent /ask conversations against a stub LLM, through the
+    old Flask route (WSGI thread pool) and the async route.
+    """
+    # Point the agent at the stub, with the same limits as shared_client()
+    client = LLMClient(base_url=start_stub(latency=latency))
+    print(f"client limit: {client.max_concurrency} concurrent calls")
+    server.agent = server.build_agent(client.chat_model(model="stub", api_key="stub"))
+
+    flask_app = server.create_app()
+    before = Starlette(routes=[Mount("/", WSGIMiddleware(flask_app, workers=wsgi_workers))])
+    for label, asgi_app, port in [(f"flask /ask, {wsgi_workers} WSGI threads", before, 5101),
+                                  ("async /ask, one event loop", create_app(flask_app, wsgi_workers), 5102)]:
+        uv_server = serve_in_thread(asgi_app, port)
+
+        async def run():
+            payload = {"history": [{"sender": "user", "message": "I'm stressed"}]}
+            limits = httpx.Limits(max_connections=streams)
+            async with httpx.AsyncClient(limits=limits, timeout=600) as http:
+                async def one():
+                    started = time.perf_counter()
+                    async with http.stream("POST", f"http://127.0.0.1:{port}/ask", json=payload) as response:
+                        body = b"".join([chunk async for chunk in response.aiter_bytes()])
+                    assert response.status_code == 200 and body, response.status_code
+                    return time.perf_counter() - started
+                return await asyncio.gather(*(one() for _ in range(streams)))
+
+        start = time.perf_counter()
+        durations = sorted(asyncio.run(run()))
+        elapsed = time.perf_counter() - start
+        uv_server.should_exit = True
+
+        print(f"{label}: {streams} streams in {elapsed:.2f}s ({streams / elapsed:.1f}/s), "
+              f"p50 {durations[len(durations) // 2]:.2f}s p99 {durations[int(len(durations) * 0.99)]:.2f}s")
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.asgi [streams]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,39 @@
+import threading
+import time
+
+from bench import use_server
+
+use_server()
+from batcher import MicroBatcher  # noqa: E402
+
+
+def benchmark(clients=64, requests_per_client=50):
+    """Compares direct per-call inference against the micro-batcher."""
+    from predict_emotion import predict_emotion
+
+    args = ([320 + i for i in range(10)], [130 + i for i in range(10)],
+            [115 + i * 0.5 for i in range(10)], [37.0] * 10)
+
+    def run(predict):
+        def client():
+            for _ in range(requests_per_client):
+                predict(*args)
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return clients * requests_per_client / (time.perf_counter() - start)
+
+    print(f"direct:  {run(predict_emotion):8.0f} predictions/s")
+    for max_wait_ms in (1, 5):
+        batcher = MicroBatcher(max_batch_size=64, max_wait_ms=max_wait_ms).start()
+        rate = run(batcher.predict)
+        print(f"batched ({max_wait_ms} ms): {rate:8.0f} predictions/s, "
+              f"{batcher.requests / batcher.batches:.1f} per batch")
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.batcher
+    benchmark()
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+
+import httpx
+
+from bench import percentile, use_server
+from bench.webhook_load_test import fake_webhook
+
+use_server()
+from events import EventBroker  # noqa: E402
+
+
+def load_test(subscribers=1000, events=200, rate=50):
+    """
+    Holds `subscribers` blocked reader threads on one broker and publishes
+    `events` deltas at `rate` per second, reporting fan-out latency.
+    """
+    broker = EventBroker()
+    latencies = []
+    latencies_lock = threading.Lock()
+    done = threading.Barrier(subscribers + 1)
+
+    def reader(subscription):
+        received = 0
+        local = []
+        for message in subscription.messages(heartbeat=5):
+            if message.startswith(":"):
+                continue
+            sent = json.loads(message.rsplit("data: ", 1)[1])["sent"]
+            local.append(time.perf_counter() - sent)
+            received += 1
+            if received == events:
+                break
+        with latencies_lock:
+            latencies.extend(local)
+        done.wait()
+
+    threads = [threading.Thread(target=reader, args=(broker.subscribe(),), daemon=True)
+               for _ in range(subscribers)]
+    for thread in threads:
+        thread.start()
+
+    start = time.perf_counter()
+    for _ in range(events):
+        broker.publish("delta", {"history": [[time.time(), 100.0]],
+                                 "sent": time.perf_counter()})
+        time.sleep(1 / rate)
+    done.wait()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    delivered = len(latencies)
+    print(f"{subscribers} subscribers, {events} events: {delivered} deliveries "
+          f"({delivered / elapsed:.0f}/s), still subscribed: {broker.subscriber_count()}")
+    print(f"fan-out latency p50 {latencies[delivered // 2] * 1e3:.2f} ms, "
+          f"p99 {latencies[int(delivered * 0.99)] * 1e3:.2f} ms")
+
+
+def http_load_test(base_url="http://localhost:5000", subscribers=1000, events=50, interval=0.2,
+                   user_id="test_user"):
+    """
+    Opens `subscribers` /stream connections to a running server, then posts
+    `events` webhooks for the dashboard user, one every `interval` seconds,
+    and times how long each takes to reach every client as a delta. The
+    interval is long enough that deltas aren't merged, so the n-th delta a
+    client receives answers the n-th webhook.
+    """
+    sent = []
+    received = [[] for _ in range(subscribers)]
+    connected = 0
+
+    async def subscriber(http, i):
+        nonlocal connected
+        async with http.stream("GET", f"{base_url}/stream") as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line == "event: snapshot":
+                    connected += 1
+                elif line == "event: delta":
+                    received[i].append(time.perf_counter())
+                    if len(received[i]) == events:
+                        return
+
+    async def run():
+        limits = httpx.Limits(max_connections=subscribers + 10)
+        async with httpx.AsyncClient(limits=limits, timeout=60) as http:
+            tasks = [asyncio.create_task(subscriber(http, i)) for i in range(subscribers)]
+            while connected < subscribers:
+                await asyncio.sleep(0.1)
+                for task in tasks:
+                    if task.done() and task.exception():
+                        raise task.exception()
+            print(f"{subscribers} /stream clients connected")
+            for _ in range(events):
+                sent.append(time.perf_counter())
+                response = await http.post(f"{base_url}/consumeTerraWebhook",
+                                           json=fake_webhook(user_id, 1))
+                response.raise_for_status()
+                await asyncio.sleep(interval)
+            await asyncio.wait(tasks, timeout=10)
+
+    asyncio.run(run())
+    latencies = [times[n] - sent[n] for times in received for n in range(min(len(times), events))]
+    missing = subscribers * events - len(latencies)
+    print(f"{events} webhooks to {subscribers} clients: {len(latencies)} deltas, {missing} missing")
+    print(f"webhook to client latency p50 {percentile(latencies, 0.5) * 1e3:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1e3:.1f} ms, max {max(latencies) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.events [subscribers]            in-process broker only
+    #        python -m bench.events http [subscribers] [base_url]
+    # For http, start the server first (python asgi.py); the webhooks it
+    # posts are stored like real ones.
+    if len(sys.argv) > 1 and sys.argv[1] == "http":
+        http_load_test(subscribers=int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+                       base_url=sys.argv[3] if len(sys.argv) > 3 else "http://localhost:5000")
+    else:
+        load_test(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
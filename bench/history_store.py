@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import time
+
+from bench import use_server
+
+use_server()
+from history_store import HistoryStore  # noqa: E402
+
+
+def _write_rows(path, rows, start_time=1739680870):
+    """Writes `rows` synthetic samples, ten per second, in history.txt format."""
+    chunk = 100000
+    with open(path, "w") as file:
+        for offset in range(0, rows, chunk):
+            file.write("".join(
+                f"{start_time + i // 10} {100 + i % 400:.2f} {i % 1000}.0\n"
+                for i in range(offset, min(rows, offset + chunk))))
+    return start_time + (rows - 1) // 10
+
+
+def benchmark(row_counts, repeats=200):
+    """Times tail and range reads against history files of increasing size."""
+    print(f"{'rows':>12} {'tail(10) us':>12} {'range us':>12} {'full parse ms':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in row_counts:
+            path = os.path.join(tmp, f"history_{rows}.txt")
+            last_time = _write_rows(path, rows)
+            store = HistoryStore(path)
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                store.tail(10)
+            tail_us = (time.perf_counter() - start) / repeats * 1e6
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                store.query(since=last_time - 60, until=last_time - 30, limit=100)
+            range_us = (time.perf_counter() - start) / repeats * 1e6
+
+            # The old read_history() parsed every line; only time it while it
+            # is still reasonable to do so.
+            full_ms = float("nan")
+            if rows <= 1000000:
+                start = time.perf_counter()
+                with open(path, "r") as file:
+                    [[float(x) for x in line.strip().split()[:2]] for line in file]
+                full_ms = (time.perf_counter() - start) * 1e3
+
+            print(f"{rows:>12} {tail_us:>12.1f} {range_us:>12.1f} {full_ms:>14.1f}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.history_store [rows ...]
+    # e.g. python -m bench.history_store 10000 1000000 100000000
+    counts = [int(x) for x in sys.argv[1:]] or [10000, 100000, 1000000, 10000000]
+    benchmark(counts)
@@ -0,0 +1,36 @@
+import asyncio
+import json
+import sys
+import time
+
+from bench import use_server
+from bench.stub_llm import start_stub
+
+use_server()
+from llm_client import LLMClient  # noqa: E402
+
+
+def benchmark(calls=200, concurrency=32, latency=0.2, fail_rate=0.05):
+    """Concurrent chat calls against the stub through one shared client."""
+    client = LLMClient(base_url=start_stub(latency=latency, fail_rate=fail_rate))
+    model = client.chat_model(model="stub", api_key="stub")
+
+    async def run():
+        gate = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with gate:
+                await model.ainvoke("hello")
+        await asyncio.gather(*(call() for _ in range(calls)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    print(f"{calls} calls, {concurrency} callers, client limit {client.max_concurrency}: "
+          f"{elapsed:.2f}s ({calls / elapsed:.0f} calls/s)")
+    print(json.dumps(client.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.llm_client [calls]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
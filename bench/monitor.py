@@ -0,0 +1,99 @@
+import asyncio
+import base64
+import io
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+import pyautogui
+from PIL import Image
+
+from agent import MonitorResponse, ScreenshotSettings, StressMonitorAgent, encode_image
+
+
+class StubLLM:
+    """Stands in for the chat model in benchmarks, with a fixed latency"""
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def invoke(self, messages):
+        time.sleep(self.latency)
+        return MonitorResponse(actions=[], analysis="stub")
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.latency)
+        return MonitorResponse(actions=[], analysis="stub")
+
+
+def benchmark_monitor(duration=30.0, capture_latency=0.5, llm_latency=1.5, cycle_period=2.0):
+    """Compare cycles per minute of the old sequential loop and the pipeline, with a stub LLM"""
+    agent = StressMonitorAgent("stub", cycle_period=cycle_period)
+    agent.llm = StubLLM(llm_latency)
+    agent.monitoring_rules = agent.load_monitoring_rules()
+    agent.load_monitoring_rules = lambda: agent.monitoring_rules
+
+    def fake_capture():
+        time.sleep(capture_latency)
+        return {"time": datetime.now().strftime("%H:%M:%S"), "stress_level": "Low stress",
+                "current_activity": "Safari", "image": "", "mime_type": "image/jpeg",
+                "screen_hash": random.getrandbits(64), "screen_bucket": random.getrandbits(16)}
+    agent.capture_observation = fake_capture
+
+    # Old shape: capture, call the LLM, then sleep for the full period
+    sequential = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        agent.handle_response(agent.llm.invoke(agent.build_messages(agent.capture_observation())))
+        sequential += 1
+        time.sleep(cycle_period)
+
+    async def run_pipeline():
+        try:
+            await asyncio.wait_for(agent.monitor_pipeline(), timeout=duration)
+        except asyncio.TimeoutError:
+            pass
+    agent.cycles = 0
+    asyncio.run(run_pipeline())
+
+    print(f"sequential: {sequential * 60 / duration:.1f} cycles/min")
+    print(f"pipelined:  {agent.cycles * 60 / duration:.1f} cycles/min")
+
+
+def benchmark_screenshot(image_path: Optional[str] = None, repeats: int = 5):
+    """Bytes per request and encode time for a range of screenshot settings"""
+    image = Image.open(image_path) if image_path else pyautogui.screenshot()
+    image.load()
+
+    # What used to be sent: the full-resolution PNG
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    image.save(buffer, format="PNG")
+    png_ms = (time.perf_counter() - start) * 1000
+    print(f"{'original PNG ' + str(image.size):<40} {len(base64.b64encode(buffer.getvalue())):>10} bytes {png_ms:8.1f} ms")
+
+    for settings in [
+        ScreenshotSettings(max_dimension=max(image.size), quality=85),
+        ScreenshotSettings(max_dimension=1920, quality=80),
+        ScreenshotSettings(max_dimension=1280, quality=70),
+        ScreenshotSettings(max_dimension=1280, quality=70, grayscale=True),
+        ScreenshotSettings(max_dimension=1280, image_format="WEBP", quality=70),
+        ScreenshotSettings(max_dimension=768, quality=60),
+        ScreenshotSettings(max_dimension=768, image_format="WEBP", quality=60, grayscale=True),
+    ]:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            data, _ = encode_image(image, settings)
+        encode_ms = (time.perf_counter() - start) / repeats * 1000
+        label = f"{settings.image_format} {settings.max_dimension}px q{settings.quality}" + (" gray" if settings.grayscale else "")
+        print(f"{label:<40} {len(data):>10} bytes {encode_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.monitor                      sequential loop vs pipeline
+    #        python -m bench.monitor screenshot [image]   encoding settings
+    if len(sys.argv) > 1 and sys.argv[1] == "screenshot":
+        benchmark_screenshot(sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        benchmark_monitor()
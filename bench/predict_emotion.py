@@ -0,0 +1,32 @@
+import time
+
+import numpy as np
+
+from bench import use_server
+
+use_server()
+from predict_emotion import StreamingPredictor, predict_emotion  # noqa: E402
+
+
+def benchmark_streaming(samples=2000):
+    """Per-prediction cost of full-window recompute versus streaming."""
+    rng = np.random.default_rng(1)
+    data = rng.uniform([0, 60, 90, 36.0], [500, 180, 160, 38.5], size=(samples, 4))
+
+    start = time.perf_counter()
+    for i in range(9, samples):
+        predict_emotion(*data[i - 9:i + 1].T)
+    full_us = (time.perf_counter() - start) / (samples - 9) * 1e6
+
+    stream = StreamingPredictor()
+    start = time.perf_counter()
+    for sample in data:
+        stream.push(*sample)
+    stream_us = (time.perf_counter() - start) / samples * 1e6
+
+    print(f"full window: {full_us:.1f} us/prediction, streaming: {stream_us:.1f} us/prediction")
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.predict_emotion
+    benchmark_streaming()
@@ -0,0 +1,41 @@
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from bench import use_emg
+
+use_emg()
+from rolling import RollingMean, RollingQuantile  # noqa: E402
+
+
+def benchmark(windows, samples=20000):
+    """Per-sample cost of the rolling engine against np.mean/np.percentile."""
+    data = np.random.default_rng(0).integers(0, 1024, samples).astype(float).tolist()
+    print(f"{'window':>8} {'numpy us/sample':>16} {'rolling us/sample':>18}")
+    for window in windows:
+        values = deque(maxlen=window)
+        start = time.perf_counter()
+        for x in data:
+            values.append(x)
+            np.percentile(list(values), 75)
+            np.mean(values)
+        numpy_us = (time.perf_counter() - start) / samples * 1e6
+
+        mean = RollingMean(window)
+        p75 = RollingQuantile(window, 0.75)
+        start = time.perf_counter()
+        for x in data:
+            mean.push(x)
+            p75.push(x)
+            p75.value()
+            mean.value()
+        rolling_us = (time.perf_counter() - start) / samples * 1e6
+
+        print(f"{window:>8} {numpy_us:>16.1f} {rolling_us:>18.1f}")
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.rolling [window ...]
+    benchmark([int(x) for x in sys.argv[1:]] or [500, 5000, 50000])
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+import time
+
+from bench import use_server
+
+use_server()
+from sample_log import SampleLog, convert, parse_history_lines  # noqa: E402
+
+
+def benchmark(rows=1000000):
+    """Compares parse time, range reads and disk size against the text format."""
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, "history.txt")
+        log_path = os.path.join(tmp, "history.bin")
+        start_time = 1739680870
+        with open(text_path, "w") as file:
+            for offset in range(0, rows, 100000):
+                file.write("".join(
+                    f"{start_time + i // 10} {100 + i % 400:.2f} {i % 1000}.0\n"
+                    for i in range(offset, min(rows, offset + 100000))))
+        convert(text_path, log_path)
+        log = SampleLog(log_path)
+
+        start = time.perf_counter()
+        with open(text_path, "r") as file:
+            parse_history_lines(file)
+        text_ms = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        samples = log.samples()
+        float(samples["rolling_avg"].mean())
+        binary_ms = (time.perf_counter() - start) * 1e3
+
+        last = start_time + (rows - 1) // 10
+        start = time.perf_counter()
+        for _ in range(1000):
+            log.downsample(since=last - 3600, until=last, points=200)
+        downsample_us = (time.perf_counter() - start) / 1000 * 1e6
+
+        print(f"{rows} rows")
+        print(f"  text:   {os.path.getsize(text_path) / 1e6:8.1f} MB, full parse {text_ms:8.1f} ms")
+        print(f"  binary: {os.path.getsize(log_path) / 1e6:8.1f} MB, map + full scan {binary_ms:8.1f} ms")
+        print(f"  binary 1h range downsampled to 200 points: {downsample_us:.1f} us")
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.sample_log [rows]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,31 @@
+import sys
+import tempfile
+import time
+
+from bench import use_server
+
+use_server()
+from biometrics import ShardedBiometrics  # noqa: E402
+from simulator import Simulator  # noqa: E402
+from write_behind import WriteBehindWriter  # noqa: E402
+
+
+def benchmark(users=10000, ticks=5):
+    """In-process ingest rate into the sharded store with write-behind persistence."""
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = WriteBehindWriter().start()
+        store = ShardedBiometrics(tmp, writer=writer)
+        simulator = Simulator(store.record, users=users, interval=0, stress_file=None, seed=0)
+        start = time.perf_counter()
+        simulator.run(ticks=ticks)
+        ingested = time.perf_counter() - start
+        writer.flush()
+        persisted = time.perf_counter() - start
+        writer.close()
+        print(f"{simulator.samples} samples for {users} users: ingested in {ingested:.2f}s "
+              f"({simulator.samples / ingested:.0f}/s), on disk after {persisted:.2f}s")
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.simulator [users]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,91 @@
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Minimal OpenAI-compatible /v1/chat/completions for tests and benchmarks.
+    Answers after `latency` seconds, streams when asked to, calls the forced
+    tool for structured output and fails a `fail_rate` share of requests
+    with 503 so retries get exercised.
+    """
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.2
+    fail_rate = 0.0
+    reply = "Hi sweetie, take a deep breath for me."
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            self.send_json({"error": {"message": "stub overloaded"}}, status=503)
+            return
+
+        message = {"role": "assistant", "content": self.reply}
+        tool_choice = body.get("tool_choice")
+        if isinstance(tool_choice, dict):
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": "call_stub", "type": "function",
+                "function": {"name": tool_choice["function"]["name"],
+                             "arguments": json.dumps({"actions": [], "analysis": "stub"})}}]}
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for word in (message["content"] or "").split(" "):
+                self.send_chunk(self.completion(body, {"delta": {"content": word + " "}}, "chat.completion.chunk"))
+            self.send_chunk(self.completion(body, {"delta": {}, "finish_reason": "stop"}, "chat.completion.chunk"))
+            self.wfile.write(b"11\r\ndata: [DONE]\n\n\r\n0\r\n\r\n")
+            return
+        finish = "tool_calls" if message["content"] is None else "stop"
+        self.send_json(self.completion(body, {"message": message, "finish_reason": finish}, "chat.completion"))
+
+    def completion(self, body, choice, object_type):
+        return {"id": "chatcmpl-stub", "object": object_type, "created": int(time.time()),
+                "model": body.get("model", "stub"), "choices": [{"index": 0, **choice}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}}
+
+    def send_chunk(self, data):
+        payload = f"data: {json.dumps(data)}\n\n".encode()
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+
+    def send_json(self, data, status=200):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The stdlib default backlog of 5 drops connections when hundreds of
+    # benchmark clients connect at once
+    request_queue_size = 1024
+
+
+def start_stub(port=0, latency=0.2, fail_rate=0.0):
+    """Runs the stub server on a daemon thread and returns its /v1 base URL."""
+    handler = type("Handler", (StubHandler,), {"latency": latency, "fail_rate": fail_rate})
+    server = StubServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.stub_llm [port]
+    # Serves the stub for manual testing; point OPENAI_BASE_URL at it.
+    url = start_stub(int(sys.argv[1]) if len(sys.argv) > 1 else 8001)
+    print(f"Stub OpenAI server on {url} (set OPENAI_BASE_URL to use it)")
+    threading.Event().wait()
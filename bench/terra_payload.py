@@ -0,0 +1,73 @@
+import json
+import random
+import sys
+import time
+
+from bench import use_server
+
+use_server()
+from terra_payload import decode, msgspec, orjson, reduce_payload  # noqa: E402
+
+
+def fake_payload(entries=10, samples_per_entry=1000):
+    """A health_data payload with `entries` data entries of detailed samples."""
+    def entry():
+        return {
+            "heart_data": {"heart_rate_data": {
+                "summary": {"avg_hr_bpm": random.uniform(60, 120)},
+                "detailed": {"hr_samples": [{"bpm": random.uniform(50, 160), "timestamp": "2025-02-16T00:00:00Z"}
+                                            for _ in range(samples_per_entry)]}}},
+            "blood_pressure_data": {"blood_pressure_samples": [
+                {"systolic_bp": random.uniform(100, 150), "diastolic_bp": random.uniform(60, 95),
+                 "timestamp": "2025-02-16T00:00:00Z"} for _ in range(samples_per_entry)]},
+            "temperature_data": {"body_temperature_samples": [
+                {"temperature_celsius": random.uniform(36, 38), "timestamp": "2025-02-16T00:00:00Z"}
+                for _ in range(samples_per_entry)]},
+            "metadata": {"end_time": "2025-02-16T00:00:00Z"}
+        }
+    return {"user": {"user_id": "bench_user"}, "type": "health_data",
+            "data": [entry() for _ in range(entries)]}
+
+
+def legacy_averages(raw):
+    """What consume_terra_webhook did before: json plus generator averages of data[0]."""
+    body = json.loads(raw)
+    heart_rate = body["data"][0]["heart_data"]["heart_rate_data"]["summary"]["avg_hr_bpm"]
+    systolic = sum(bp["systolic_bp"] for bp in body["data"][0]["blood_pressure_data"]
+                   ["blood_pressure_samples"]) / len(body["data"][0]["blood_pressure_data"]["blood_pressure_samples"])
+    diastolic = sum(bp["diastolic_bp"] for bp in body["data"][0]["blood_pressure_data"]
+                    ["blood_pressure_samples"]) / len(body["data"][0]["blood_pressure_data"]["blood_pressure_samples"])
+    temperature = sum(temp["temperature_celsius"] for temp in body["data"][0]["temperature_data"]
+                      ["body_temperature_samples"]) / len(body["data"][0]["temperature_data"]["body_temperature_samples"])
+    return heart_rate, systolic, diastolic, temperature
+
+
+def benchmark(entries=10, samples_per_entry=1000, repeats=20):
+    """Decode + reduce time for one large payload with each available decoder."""
+    raw = json.dumps(fake_payload(entries, samples_per_entry)).encode()
+    print(f"payload: {entries} entries x {samples_per_entry} samples per signal, {len(raw) / 1e6:.1f} MB")
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - start) / repeats * 1e3
+
+    print(f"{'json + generators (data[0] only, means only)':<48} {timed(lambda: legacy_averages(raw)):8.2f} ms")
+    decoders = [("json", json.loads)]
+    if orjson is not None:
+        decoders.append(("orjson", orjson.loads))
+    if msgspec is not None:
+        decoders.append(("msgspec typed", decode))
+    for name, decoder in decoders:
+        decode_ms = timed(lambda: decoder(raw))
+        payload = decoder(raw)
+        reduce_ms = timed(lambda: reduce_payload(payload))
+        print(f"{name + ' + numpy (all entries, full stats)':<48} {decode_ms + reduce_ms:8.2f} ms "
+              f"(decode {decode_ms:.2f}, reduce {reduce_ms:.2f})")
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.terra_payload [entries] [samples_per_entry]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10,
+              int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
@@ -0,0 +1,74 @@
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench import percentile
+
+
+def fake_webhook(user_id, stress_level):
+    """A Terra health_data webhook with simulator.py's sample distributions."""
+    return {
+        "user": {"user_id": user_id},
+        "type": "health_data",
+        "data": [{
+            "heart_data": {"heart_rate_data": {"summary": {
+                "avg_hr_bpm": random.randint(70 + stress_level * 10, 120 + stress_level * 10)}}},
+            "blood_pressure_data": {"blood_pressure_samples": [
+                {"systolic_bp": random.randint(100 + stress_level * 5, 130 + stress_level * 5),
+                 "diastolic_bp": random.randint(60 + stress_level * 5, 80 + stress_level * 5)}]},
+            "temperature_data": {"body_temperature_samples": [
+                {"temperature_celsius": round(random.uniform(36.0, 37.0) + stress_level * 0.1, 1)}]},
+            "metadata": {"end_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        }]
+    }
+
+
+def load_test(base_url="http://localhost:5000", users=10000, samples_per_user=2,
+              queries=2000, workers=32):
+    """
+    Posts webhooks for `users` simulated wearables to a running server, then
+    times /history?user= for random users.
+    """
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def post(user_id):
+        response = session().post(f"{base_url}/consumeTerraWebhook",
+                                  json=fake_webhook(user_id, random.randint(0, 4)))
+        response.raise_for_status()
+
+    def query(user_id):
+        started = time.perf_counter()
+        response = session().get(f"{base_url}/history", params={"user": user_id})
+        response.raise_for_status()
+        return time.perf_counter() - started
+
+    user_ids = [f"load-user-{i:05d}" for i in range(users)]
+    with ThreadPoolExecutor(workers) as pool:
+        start = time.perf_counter()
+        list(pool.map(post, user_ids * samples_per_user))
+        elapsed = time.perf_counter() - start
+        posted = users * samples_per_user
+        print(f"ingest: {posted} webhooks for {users} users in {elapsed:.1f}s "
+              f"({posted / elapsed:.0f}/s)")
+
+        latencies = list(pool.map(query, random.choices(user_ids, k=queries)))
+        print(f"/history?user=: {queries} queries, p50 {percentile(latencies, 0.5) * 1e3:.1f} ms, "
+              f"p99 {percentile(latencies, 0.99) * 1e3:.1f} ms")
+
+    print("server stats:", requests.get(f"{base_url}/stats").json().get("users"), "users")
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.webhook_load_test [users] [base_url]
+    # Start the server first (python server.py or python asgi.py).
+    load_test(users=int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+              base_url=sys.argv[2] if len(sys.argv) > 2 else "http://localhost:5000")
@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import time
+
+from bench import use_server
+
+use_server()
+from biometrics import BiometricCache  # noqa: E402
+from write_behind import FSYNC_POLICIES, WriteBehindWriter  # noqa: E402
+
+
+def benchmark(samples=10000):
+    """Per-sample record() latency with direct appends against write-behind."""
+    def run(label, writer=None):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = BiometricCache(*(os.path.join(tmp, name) for name in
+                                     ("heart_rate.txt", "blood_pressure.txt", "body_temperature.txt")),
+                                   writer=writer)
+            latencies = []
+            start = time.perf_counter()
+            for i in range(samples):
+                started = time.perf_counter()
+                cache.record(70 + i % 50, 120, 80, 36.6)
+                latencies.append(time.perf_counter() - started)
+            if writer is not None:
+                writer.flush()
+            elapsed = time.perf_counter() - start
+            latencies.sort()
+            print(f"{label:<28} p50 {latencies[samples // 2] * 1e6:7.1f} us  "
+                  f"p99 {latencies[int(samples * 0.99)] * 1e6:7.1f} us  "
+                  f"max {latencies[-1] * 1e3:6.2f} ms  total {elapsed:.2f}s")
+            if writer is not None:
+                print(f"{'':<28} {writer.stats()}")
+                writer.close()
+
+    run("direct (3x open/append)")
+    for policy in FSYNC_POLICIES:
+        run(f"write-behind, fsync={policy}", WriteBehindWriter(fsync=policy).start())
+
+
+if __name__ == "__main__":
+    # Usage: python -m bench.write_behind [samples]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -31,6 +31,8 @@ const EMOTION_TO_MESSAGE = {
 const page = (props: Props) => {
 	const [chatInput, setChatInput] = useState<string>("");
 	const [chatHistory, setChatHistory] = useState<ChatObject[]>([]);
+	// the server keeps the conversation, so each turn only sends the new message
+	const conversationId = useRef<string>(crypto.randomUUID());
 
 	async function sendChat() {
 		// fetch data from localhost 5000
@@ -44,13 +46,23 @@ const page = (props: Props) => {
 
 		setChatHistory(newChatHistory);
 
-		const response = await fetch("http://127.0.0.1:5000/ask", {
-			body: JSON.stringify({ history: newChatHistory }),
-			headers: {
-				"Content-Type": "application/json",
-			},
-			method: "POST",
-		});
+		const ask = (payload: object) =>
+			fetch("http://127.0.0.1:5000/ask", {
+				body: JSON.stringify({
+					conversation_id: conversationId.current,
+					...payload,
+				}),
+				headers: {
+					"Content-Type": "application/json",
+				},
+				method: "POST",
+			});
+
+		let response = await ask({ message: chatInput });
+		if (response.status === 409) {
+			// the server restarted or evicted this conversation, so send it all once
+			response = await ask({ history: newChatHistory });
+		}
 		const reader = response.body?.getReader();
 
 		if (!reader) return;
@@ -88,42 +100,45 @@ const page = (props: Props) => {
 
 	const [data, setData] = useState<any[]>();
 	const [biometrics, setBiometrics] = useState<any>();
+	const [actions, setActions] = useState<any[]>();
 	const [prediction, setPrediction] = useState<
 		"normal" | "fear" | "anger" | "sadness"
 	>();
 	useEffect(() => {
-		function fetchData() {
-			// fetch data from localhost 5000
-			fetch("http://127.0.0.1:5000/history")
-				.then((res) => res.json())
-				.then((data) => {
-					console.log(data);
-					setData(data.history);
-					setBiometrics(data.biometrics);
-					setPrediction(data.prediction);
-				});
-		}
-
-		// interval to fetch data every 5 seconds
-		try {
-			fetchData();
-		} catch (e) {
-			console.log("Error fetching data");
-		}
+		// the server pushes a snapshot on connect and a delta whenever a new
+		// sample, prediction or rule arrives, so there is nothing to poll
+		const source = new EventSource("http://127.0.0.1:5000/stream");
+
+		source.addEventListener("snapshot", (event) => {
+			const snapshot = JSON.parse((event as MessageEvent).data);
+			setData(snapshot.history);
+			setBiometrics(snapshot.biometrics);
+			setPrediction(snapshot.prediction);
+			setActions(snapshot.rules);
+		});
 
-		const interval = setInterval(() => {
-			console.log("fetching data...");
-			try {
-				fetchData();
-			} catch (e) {
-				console.log("Error fetching data");
+		source.addEventListener("delta", (event) => {
+			const delta = JSON.parse((event as MessageEvent).data);
+			if (delta.history) {
+				setData((oldData) => [...(oldData ?? []), ...delta.history].slice(-10));
+			}
+			if (delta.biometrics) {
+				setBiometrics(delta.biometrics);
 			}
-		}, 500);
+			if (delta.rules) {
+				setActions(delta.rules);
+			}
+			setPrediction(delta.prediction);
+		});
 
-		return () => clearInterval(interval);
+		source.onerror = () => {
+			// EventSource reconnects on its own and gets a fresh snapshot
+			console.log("Error streaming data");
+		};
+
+		return () => source.close();
 	}, [setData]);
 
-	const [actions, setActions] = useState<any[]>();
 	function fetchActions() {
 		fetch("http://127.0.0.1:5000/rules")
 			.then((res) => res.json())
@@ -1,24 +1,38 @@
+import os
 import serial
+import struct
 import time
 from datetime import datetime
-from collections import deque
-import numpy as np
 import threading
+from rolling import RollingMean, RollingQuantile
 
 # File paths
 file_path = "../server/history.txt"
+binary_file_path = "../server/history.bin"
 shock_file_path = "../shock.txt"
 stress_file_path = "../stress.txt"
 
-# Initialize deque with max length of 1000 for rolling average
-data_window = deque(maxlen=500)
-data_window_max = deque(maxlen=5000)
+# Rolling average over the last 500 samples and the 75th percentile over the
+# last 5000, both updated in O(1)/O(log n) per sample
+data_window = RollingMean(500)
+data_window_max = RollingQuantile(5000, 0.75)
 output_every = 500
 current_output_index = 0
 shock_status = False
 
-def put_stress_level(stress_levels):
-    stress_level = np.percentile(list(stress_levels), 75)
+# Fixed-size binary record (timestamp, rolling average, raw reading), the same
+# layout as SAMPLE_DTYPE in server/sample_log.py
+sample_record = struct.Struct("<qff")
+
+# Stress categories from lowest to highest
+stress_levels = ["Low stress", "Normal but not low stress",
+                 "Moderately high stress", "Very High stress", "EXTREMELY high stress"]
+# How far past a threshold the level has to move before the category changes,
+# so noise around a boundary doesn't flap between two categories. 0 disables it.
+stress_hysteresis = 0
+current_stress = None
+
+def classify_stress(stress_level):
     stress_out = ""
     if 0 < stress_level < 100:
         stress_out = "Low stress"
@@ -30,14 +44,39 @@ def put_stress_level(stress_levels):
         stress_out = "Very High stress"
     else:
         stress_out = "EXTREMELY high stress"
-    
-    with open(stress_file_path, "w") as f:
-        f.write(stress_out)
+    return stress_out
+
+def write_atomic(path, text):
+    # Readers only ever see the old or the new file, never a truncated one
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def put_stress_level(stress_level):
+    global current_stress
+    stress_out = classify_stress(stress_level)
+    if stress_out == current_stress:
+        return
+
+    if current_stress is not None and stress_hysteresis:
+        # Classify as if the level were stress_hysteresis closer to the
+        # current category and only move if that still changes it
+        current_index = stress_levels.index(current_stress)
+        if stress_levels.index(stress_out) > current_index:
+            stress_out = classify_stress(stress_level - stress_hysteresis)
+            if stress_levels.index(stress_out) <= current_index:
+                return
+        else:
+            stress_out = classify_stress(stress_level + stress_hysteresis)
+            if stress_levels.index(stress_out) >= current_index:
+                return
+
+    write_atomic(stress_file_path, stress_out)
+    current_stress = stress_out
 
 def calculate_rolling_average():
-    if not data_window:
-        return None
-    return np.mean(data_window)
+    return data_window.value()
 
 def check_shock_status():
     global shock_status
@@ -62,7 +101,7 @@ except serial.SerialException as e:
 shock_thread = threading.Thread(target=check_shock_status, daemon=True)
 shock_thread.start()
 
-with open(file_path, "a") as file:
+with open(file_path, "a") as file, open(binary_file_path, "ab") as binary_file:
     while True:
         try:
             # Read the data, decode, and strip
@@ -71,9 +110,9 @@ with open(file_path, "a") as file:
                 try:
                     # Convert data to float and add to rolling window
                     numeric_data = float(data)
-                    data_window.append(numeric_data)
-                    data_window_max.append(numeric_data)
-                    put_stress_level(data_window_max)
+                    data_window.push(numeric_data)
+                    data_window_max.push(numeric_data)
+                    put_stress_level(data_window_max.value())
 
                     # Calculate rolling average
                     rolling_avg = calculate_rolling_average()
@@ -84,6 +123,9 @@ with open(file_path, "a") as file:
 
                     if current_output_index == 0:
                         print(log_entry, end="")  # Print to console
+                        binary_file.write(sample_record.pack(
+                            int(timestamp), rolling_avg, numeric_data))
+                        binary_file.flush()
                         file.write(log_entry)
                         file.flush()  # Ensure data is written immediately
                 
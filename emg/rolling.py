@@ -0,0 +1,150 @@
+import math
+import random
+from collections import deque
+
+
+class _Node:
+    __slots__ = ("value", "next", "width")
+
+    def __init__(self, value, next, width):
+        self.value = value
+        self.next = next
+        self.width = width
+
+
+class IndexableSkiplist:
+    """
+    Sorted multiset with O(log n) insert, remove and lookup by rank.
+
+    Each link stores how many elements it skips, so the k-th smallest value
+    can be found by walking down the levels like a binary search.
+    """
+
+    def __init__(self, expected_size=100):
+        self.size = 0
+        self.maxlevels = int(1 + math.log(max(expected_size, 2), 2))
+        self._tail = _Node(math.inf, [], [])
+        self.head = _Node(None, [self._tail] * self.maxlevels, [1] * self.maxlevels)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        node = self.head
+        i += 1
+        for level in reversed(range(self.maxlevels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def insert(self, value):
+        chain = [None] * self.maxlevels
+        steps_at_level = [0] * self.maxlevels
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = min(self.maxlevels, 1 - int(math.log(random.random(), 2.0)))
+        new_node = _Node(value, [None] * levels, [None] * levels)
+        steps = 0
+        for level in range(levels):
+            prev = chain[level]
+            new_node.next[level] = prev.next[level]
+            prev.next[level] = new_node
+            new_node.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, self.maxlevels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        chain = [None] * self.maxlevels
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        if value != chain[0].next[0].value:
+            raise KeyError("Value not found")
+
+        levels = len(chain[0].next[0].next)
+        for level in range(levels):
+            prev = chain[level]
+            prev.width[level] += prev.next[level].width[level] - 1
+            prev.next[level] = prev.next[level].next[level]
+        for level in range(levels, self.maxlevels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+
+class RollingMean:
+    """Mean of the last `window` samples, kept as a running sum."""
+
+    def __init__(self, window):
+        self.window = window
+        self._values = deque()
+        self._sum = 0.0
+        self._pushes = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def push(self, value):
+        self._values.append(value)
+        self._sum += value
+        if len(self._values) > self.window:
+            self._sum -= self._values.popleft()
+
+        # Re-add from scratch once per window so floating point error from
+        # the running sum can't build up. Amortized this is still O(1).
+        self._pushes += 1
+        if self._pushes % self.window == 0:
+            self._sum = math.fsum(self._values)
+
+    def value(self):
+        if not self._values:
+            return None
+        return self._sum / len(self._values)
+
+
+class RollingQuantile:
+    """
+    Exact quantile of the last `window` samples, interpolated the same way
+    as np.percentile, in O(log window) per sample.
+    """
+
+    def __init__(self, window, q):
+        self.window = window
+        self.q = q
+        self._values = deque()
+        self._sorted = IndexableSkiplist(window)
+
+    def __len__(self):
+        return len(self._values)
+
+    def push(self, value):
+        self._values.append(value)
+        self._sorted.insert(value)
+        if len(self._values) > self.window:
+            self._sorted.remove(self._values.popleft())
+
+    def value(self):
+        n = len(self._values)
+        if not n:
+            return None
+        position = (n - 1) * self.q
+        lower = math.floor(position)
+        a = self._sorted[lower]
+        if lower + 1 >= n:
+            return a
+        b = self._sorted[lower + 1]
+        t = position - lower
+        # Same formulation as numpy's linear interpolation.
+        if t >= 0.5:
+            return b - (b - a) * (1 - t)
+        return a + (b - a) * t
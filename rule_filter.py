@@ -0,0 +1,162 @@
+import re
+from datetime import time as dtime
+from typing import List, Optional, Tuple
+
+# Stress categories written by emg/read_data.py, from lowest to highest
+STRESS_LEVELS = ["Low stress", "Normal but not low stress",
+                 "Moderately high stress", "Very High stress", "EXTREMELY high stress"]
+
+# Phrases in a condition and the range of stress categories (by index) they
+# allow. Only wording about the user's stress counts: "extremely distracted"
+# or "help me calm down" says nothing about the level the rule requires.
+STRESS_PHRASES = [
+    (r"\bextreme(ly)? (high )?stress(ed)?\b", (4, 4)),
+    (r"\bvery (high stress|stressed)\b", (3, 4)),
+    (r"\bhigh stress\b|\bstressed\b", (2, 4)),
+    (r"\blow stress\b", (0, 1)),
+]
+
+# Named parts of the day as (start, end) hours; the window may wrap midnight
+DAY_PARTS = {
+    "morning": (5, 12),
+    "afternoon": (12, 17),
+    "evening": (17, 22),
+    "night": (21, 6),
+}
+
+# Websites are only visible on screen, so a browser in front still matches them
+WEBSITES = ["youtube", "twitter", "instagram", "facebook", "tiktok", "reddit",
+            "netflix", "twitch", "linkedin", "amazon", "x.com"]
+BROWSERS = ["safari", "chrome", "firefox", "arc", "edge", "brave", "opera"]
+APPS = ["slack", "discord", "spotify", "xcode", "vscode", "terminal", "zoom",
+        "steam", "notion", "excel", "minecraft", "roblox"]
+
+# Wording that a simple conjunction of predicates would get wrong
+UNSAFE = re.compile(r"\bnot\b|n't\b|\bunless\b|\bexcept\b|\bwithout\b|\bno longer\b")
+
+CLOCK = r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b"
+
+
+def _clock(hour: str, minute: Optional[str], meridiem: str) -> dtime:
+    hour = int(hour) % 12 + (12 if meridiem == "pm" else 0)
+    return dtime(hour, int(minute or 0))
+
+
+def _in_window(now: dtime, start: dtime, end: dtime) -> bool:
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+
+def _keyword_pattern(words: List[str]) -> re.Pattern:
+    return re.compile(r"\b(" + "|".join(re.escape(word) for word in words) + r")\b")
+
+
+WEBSITE_PATTERN = _keyword_pattern(WEBSITES)
+APP_PATTERN = _keyword_pattern(APPS)
+
+
+class CompiledCondition:
+    """
+    Cheap checks extracted from a free-text rule condition.
+
+    A rule can only be ruled out by a check it actually compiled, so anything
+    the parser doesn't understand (e.g. "current time > 2 hours") leaves the
+    rule as a candidate for the LLM to judge.
+    """
+
+    def __init__(self, condition: str):
+        self.condition = condition
+        self.windows: List[Tuple[dtime, dtime]] = []
+        self.stress: Optional[Tuple[int, int]] = None
+        self.websites: List[str] = []
+        self.apps: List[str] = []
+        self.compile(condition.lower())
+
+    def compile(self, text: str):
+        if UNSAFE.search(text):
+            return
+
+        windows = []
+        between = re.search(r"between\s+" + CLOCK + r"\s+and\s+" + CLOCK, text)
+        if between:
+            groups = between.groups()
+            windows.append((_clock(*groups[:3]), _clock(*groups[3:])))
+        else:
+            after = re.search(r"(?:after|past)\s+" + CLOCK, text)
+            before = re.search(r"before\s+" + CLOCK, text)
+            if after and before:
+                windows.append((_clock(*after.groups()), _clock(*before.groups())))
+            elif after:
+                start = _clock(*after.groups())
+                # "after 10pm" means the rest of the night, not until midnight
+                windows.append((start, dtime(5) if start.hour >= 18 else dtime(0, 0)))
+            elif before:
+                windows.append((dtime(0, 0), _clock(*before.groups())))
+        for part, (start, end) in DAY_PARTS.items():
+            if re.search(r"\b" + part + r"\b", text):
+                windows.append((dtime(start), dtime(end)))
+
+        stress = None
+        for pattern, levels in STRESS_PHRASES:
+            if re.search(pattern, text):
+                stress = levels
+                break
+
+        websites = WEBSITE_PATTERN.findall(text)
+        apps = APP_PATTERN.findall(text)
+
+        # "a or b" is fine within one kind of check (any of these sites) but
+        # not across kinds ("stressed or after 10pm"), which we'd AND together
+        kinds = sum(bool(x) for x in (windows, stress, websites or apps))
+        if kinds > 1 and re.search(r"\bor\b", text):
+            return
+
+        self.windows = windows
+        self.stress = stress
+        self.websites = websites
+        self.apps = apps
+
+    @property
+    def compiled(self) -> bool:
+        return bool(self.windows or self.stress or self.websites or self.apps)
+
+    def matches(self, now: dtime, stress_level: str, activity: str) -> bool:
+        """False only if a compiled check rules the condition out"""
+        if self.windows and not any(_in_window(now, start, end) for start, end in self.windows):
+            return False
+
+        if self.stress and stress_level in STRESS_LEVELS:
+            low, high = self.stress
+            if not low <= STRESS_LEVELS.index(stress_level) <= high:
+                return False
+
+        if self.websites or self.apps:
+            activity = activity.lower()
+            on_site = any(site in activity for site in self.websites)
+            on_app = any(app in activity for app in self.apps)
+            in_browser = bool(self.websites) and any(browser in activity for browser in BROWSERS)
+            if not (on_site or on_app or in_browser):
+                return False
+
+        return True
+
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Tokens the model will see for `text`. Uses tiktoken when it is installed
+    and its vocabulary can be loaded, else a rough 4 characters per token.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // 4
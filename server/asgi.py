@@ -0,0 +1,91 @@
+import asyncio
+
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import server
+from events import format_sse
+
+
+async def handle_query(request):
+    """
+    Async version of the Flask /ask route, same payload and plain-text
+    stream. Every chat is a task on the event loop while it waits on the
+    LLM, instead of a WSGI thread held for the whole generation.
+    """
+    data = await request.json()
+    try:
+        messages = server.prepare_chat(data)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    if messages is None:
+        return JSONResponse({"error": "Unknown conversation, send the full history"}, status_code=409)
+
+    # The first /ask imports langgraph and builds the agent; keep that off the loop
+    agent = await asyncio.to_thread(server.get_agent)
+
+    async def generate():
+        reply = []
+        async for chunk, metadata in agent.astream({"messages": messages}, stream_mode="messages"):
+            if hasattr(chunk, "content"):
+                text = chunk.content
+            else:
+                text = str(chunk)
+            reply.append(text)
+            yield text
+        server.finish_chat(data, messages, "".join(reply))
+    return StreamingResponse(generate(), media_type="text/plain")
+
+
+async def stream(request):
+    """
+    Async version of the Flask /stream route. An SSE client stays connected
+    indefinitely, so on the WSGI thread pool a handful of dashboards would
+    hold every worker and block all other routes; here each one is a task
+    waiting on its queue.
+    """
+    subscription = server.event_broker.subscribe_async()
+    try:
+        # Reads files and may compute a prediction, so not on the loop
+        snapshot = await asyncio.to_thread(server.stream_snapshot)
+    except BaseException:
+        server.event_broker.unsubscribe(subscription)
+        raise
+
+    async def generate():
+        try:
+            yield format_sse("snapshot", snapshot)
+            async for message in subscription.messages():
+                yield message
+        finally:
+            server.event_broker.unsubscribe(subscription)
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=server.SSE_HEADERS)
+
+
+def create_app(flask_app=None, wsgi_workers=10):
+    """
+    /ask and /stream served natively, every other route handed to the Flask
+    app, which keeps its own CORS handling. Starts the server's background
+    threads unless a Flask app is passed in, so importing this module starts
+    nothing: serve it with `python asgi.py` or
+    `uvicorn --factory asgi:create_app`.
+    """
+    if flask_app is None:
+        flask_app = server.create_app()
+    cors = Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"],
+                      allow_headers=["*"], allow_credentials=True)
+    return Starlette(routes=[
+        Route("/ask", handle_query, methods=["POST"], middleware=[cors]),
+        Route("/stream", stream, methods=["GET"], middleware=[cors]),
+        Mount("/", WSGIMiddleware(flask_app, workers=wsgi_workers)),
+    ])
+
+
+if __name__ == "__main__":
+    # Usage: python asgi.py   serve on port 5000 (same as server.py)
+    uvicorn.run("asgi:create_app", factory=True, host="0.0.0.0", port=5000)
@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects emotion predictions from many request threads and runs them
+    through the LSTM together.
+
+    The worker waits up to max_wait_ms after the first request for others to
+    arrive, then stacks up to max_batch_size sequences into one tensor and
+    runs a single forward pass. Raising max_wait_ms trades latency for
+    throughput.
+
+    predict_emotion (torch and the LSTM weights) is imported by the first
+    submit, so neither costs anything until a prediction is asked for.
+    """
+
+    def __init__(self, max_batch_size=32, max_wait_ms=5):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the worker; submit() does this itself if nobody has."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, stress, bpm, blood_pressure, temperature) -> Future:
+        """Queues a prediction and returns a Future for the emotion label."""
+        from predict_emotion import build_sequence
+
+        # Validate in the caller's thread so bad input never reaches a batch.
+        sequence = build_sequence(stress, bpm, blood_pressure, temperature)
+        self.start()
+        future = Future()
+        self._queue.put((sequence, future))
+        return future
+
+    def predict(self, stress, bpm, blood_pressure, temperature):
+        """Drop-in, blocking replacement for predict_emotion()."""
+        return self.submit(stress, bpm, blood_pressure, temperature).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            sequences = [sequence for sequence, _ in batch]
+            try:
+                # Already imported by submit(), so this is a dict lookup
+                from predict_emotion import predict_emotion_batch
+                labels = predict_emotion_batch(sequences)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), label in zip(batch, labels):
+                future.set_result(label)
+
+
+class StreamingPredictions:
+    """
+    Every user's latest emotion prediction, updated sample by sample.
+
+    push() hands a new sample, the same (stress, bpm, systolic blood
+    pressure, temperature) row that BiometricBuffers.features() returns, to
+    a worker thread. The worker advances that user's StreamingPredictor (see
+    predict_emotion.py) by one step and keeps the label with the buffers'
+    generation, so latest() is a dict lookup rather than a forward pass
+    over the whole window, and gives the same label as one.
+
+    The queue is bounded: past `max_queue` pending samples new ones are
+    dropped, and a user whose samples were dropped starts a fresh window
+    (the generations no longer follow on). Until a user's predictor has
+    caught up with its buffers, latest() returns None and the caller falls
+    back to the full window.
+    """
+
+    def __init__(self, window=10, max_queue=100000):
+        self.window = window
+        self.samples = 0
+        self.dropped = 0
+        self._predictors = {}
+        self._latest = {}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the worker; push() does this itself if nobody has."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return self
+
+    def push(self, user, generation, stress, bpm, blood_pressure, temperature):
+        """Queues the sample stored as `generation` of the user's buffers."""
+        self.start()
+        try:
+            self._queue.put_nowait((user, generation, stress, bpm, blood_pressure, temperature))
+        except queue.Full:
+            self.dropped += 1
+
+    def latest(self, user, generation):
+        """The label for the window ending at `generation`, if it is computed."""
+        latest = self._latest.get(user)
+        if latest is not None and latest[1] == generation:
+            return latest[0]
+        return None
+
+    def user_count(self):
+        return len(self._predictors)
+
+    def _run(self):
+        # torch and the weights load here, not on the thread that pushed
+        from predict_emotion import StreamingPredictor
+
+        while True:
+            user, generation, *sample = self._queue.get()
+            try:
+                predictor, last = self._predictors.get(user, (None, None))
+                if predictor is None or generation != last + 1:
+                    # First sample, or some were dropped or loaded from disk
+                    predictor = StreamingPredictor(self.window)
+                self._predictors[user] = (predictor, generation)
+                label = predictor.push(*sample)
+            except Exception as e:
+                print("Error updating prediction:", e)
+                continue
+            self.samples += 1
+            if label is not None:
+                self._latest[user] = (label, generation)
@@ -0,0 +1,263 @@
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from history_store import tail_lines
+
+
+class RingBuffer:
+    """Fixed-size, array-backed buffer that keeps only the most recent rows."""
+
+    def __init__(self, capacity, width=1):
+        self.capacity = capacity
+        self._data = np.zeros((capacity, width), dtype=np.float64)
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def append(self, values):
+        self._data[self._count % self.capacity] = values
+        self._count += 1
+
+    def latest(self, n=None):
+        """Returns (a copy of) the last n rows in the order they were appended."""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        return self.rows(size - n, size)
+
+    def rows(self, start, end):
+        """Returns (a copy of) rows start to end, where row 0 is the oldest kept."""
+        first = self._count - len(self)
+        indices = np.arange(first + start, first + end) % self.capacity
+        return self._data[indices]
+
+    def value(self, i, column=0):
+        """A single value from row i, where row 0 is the oldest kept."""
+        first = self._count - len(self)
+        return self._data[(first + i) % self.capacity, column]
+
+
+class BiometricBuffers:
+    """
+    Bounded heart rate, blood pressure and temperature history of one user,
+    plus the EMG stress level current when each sample arrived. Stress is
+    only kept in memory; samples loaded from disk get the level at startup.
+    """
+
+    def __init__(self, capacity=1000):
+        self.heart_rate = RingBuffer(capacity)
+        self.blood_pressure = RingBuffer(capacity, width=2)
+        self.body_temperature = RingBuffer(capacity)
+        self.stress = RingBuffer(capacity)
+        # Bumped on every new sample so readers can tell when data changed.
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def append(self, heart_rate, systolic_bp, diastolic_bp, body_temperature, stress=0.0):
+        """Adds one sample and returns the new generation."""
+        with self._lock:
+            return self._append(heart_rate, systolic_bp, diastolic_bp, body_temperature, stress)
+
+    def _append(self, heart_rate, systolic_bp, diastolic_bp, body_temperature, stress):
+        self.heart_rate.append(heart_rate)
+        self.blood_pressure.append([systolic_bp, diastolic_bp])
+        self.body_temperature.append(body_temperature)
+        self.stress.append(stress)
+        self.generation += 1
+        return self.generation
+
+    def heart_rates(self, n):
+        """Returns the last n heart rates as a list of floats."""
+        with self._lock:
+            return self.heart_rate.latest(n)[:, 0].tolist()
+
+    def features(self, n):
+        """
+        The last n samples as the model's (stress, bpm, systolic blood
+        pressure, temperature) rows, oldest first, with the generation they
+        end at.
+        """
+        with self._lock:
+            n = min(n, len(self.heart_rate), len(self.blood_pressure),
+                    len(self.body_temperature), len(self.stress))
+            rows = np.column_stack((self.stress.latest(n)[:, 0],
+                                    self.heart_rate.latest(n)[:, 0],
+                                    self.blood_pressure.latest(n)[:, 0],
+                                    self.body_temperature.latest(n)[:, 0]))
+            return rows, self.generation
+
+    def snapshot(self, heart_rate_points=20):
+        """Returns the biometrics in the shape served by /history."""
+        with self._lock:
+            heart_rate = self.heart_rate.latest(heart_rate_points)[:, 0].tolist()
+            blood_pressure = self.blood_pressure.latest(1)
+            body_temperature = self.body_temperature.latest(1)
+
+        return {
+            "heart_rate": [{"time": i, "rate": rate}
+                           for i, rate in enumerate(heart_rate)],
+            "blood_pressure_high": float(blood_pressure[0, 0]) if len(blood_pressure) else None,
+            "blood_pressure_low": float(blood_pressure[0, 1]) if len(blood_pressure) else None,
+            "body_temperature": float(body_temperature[0, 0]) if len(body_temperature) else None
+        }
+
+
+class BiometricCache(BiometricBuffers):
+    """
+    In-memory view of the Terra biometrics.
+
+    Webhook samples go into bounded ring buffers and are appended to the text
+    files only so that they survive a restart, which means reads never touch
+    the disk. The buffers are warm-started from the tail of each file. With
+    a WriteBehindWriter the appends happen on its thread instead of the
+    caller's.
+    """
+
+    def __init__(self, heart_rate_file, blood_pressure_file, body_temperature_file,
+                 capacity=1000, writer=None):
+        super().__init__(capacity)
+        self.heart_rate_file = heart_rate_file
+        self.blood_pressure_file = blood_pressure_file
+        self.body_temperature_file = body_temperature_file
+        self.writer = writer
+
+    def load(self, stress=0.0):
+        """
+        Fills the buffers from the most recent lines of the persisted files,
+        with `stress` as the stress level of every loaded sample.
+        """
+        with self._lock:
+            self._load_file(self.heart_rate_file, self.heart_rate)
+            self._load_file(self.blood_pressure_file, self.blood_pressure)
+            self._load_file(self.body_temperature_file, self.body_temperature)
+            for _ in range(len(self.heart_rate)):
+                self.stress.append(stress)
+            self.generation += 1
+
+    def _load_file(self, path, buffer):
+        try:
+            lines = tail_lines(path, buffer.capacity)
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                buffer.append([float(x) for x in line.split(b",")])
+            except ValueError:
+                # Skip corrupt lines rather than refusing to start.
+                continue
+
+    def record(self, heart_rate, systolic_bp, diastolic_bp, body_temperature, stress=0.0):
+        """
+        Stores one webhook sample in memory and appends it to the files.
+        Returns the generation it was stored as.
+        """
+        with self._lock:
+            generation = self._append(heart_rate, systolic_bp, diastolic_bp, body_temperature, stress)
+
+            if self.writer is not None:
+                self.writer.write(self.heart_rate_file, f"{heart_rate}\n")
+                self.writer.write(self.blood_pressure_file, f"{systolic_bp}, {diastolic_bp}\n")
+                self.writer.write(self.body_temperature_file, f"{body_temperature}\n")
+                return generation
+
+            with open(self.heart_rate_file, "a") as file:
+                file.write(f"{heart_rate}\n")
+
+            with open(self.blood_pressure_file, "a") as file:
+                file.write(f"{systolic_bp}, {diastolic_bp}\n")
+
+            with open(self.body_temperature_file, "a") as file:
+                file.write(f"{body_temperature}\n")
+            return generation
+
+
+class _Shard:
+    def __init__(self, path):
+        self.path = path
+        self.users = {}
+        self.file = None
+        self.lock = threading.Lock()
+
+
+class ShardedBiometrics:
+    """
+    Per-user biometrics for many wearables.
+
+    Users are spread over `shards` partitions by a stable hash of their id.
+    Each partition has its own lock and its own append-only file of
+    "heart_rate,systolic,diastolic,temperature,user_id" lines, so webhooks
+    for different users rarely wait on each other. Every user gets a small
+    BiometricBuffers, which bounds memory per user. With a WriteBehindWriter
+    the file appends happen on its thread instead of the caller's. The
+    directory must already exist; server.create_app() makes it.
+    """
+
+    def __init__(self, directory, shards=64, capacity=100, writer=None):
+        self.directory = directory
+        self.capacity = capacity
+        self.writer = writer
+        self._shards = [_Shard(os.path.join(directory, f"shard-{i:03d}.csv"))
+                        for i in range(shards)]
+
+    def _shard(self, user_id):
+        # crc32 rather than hash() so a user maps to the same file after a restart
+        return self._shards[zlib.crc32(user_id.encode()) % len(self._shards)]
+
+    def load(self, lines_per_shard=100000, stress=0.0):
+        """
+        Warm-starts every user from the most recent lines of each shard file,
+        with `stress` as the stress level of every loaded sample.
+        """
+        for shard in self._shards:
+            try:
+                lines = tail_lines(shard.path, lines_per_shard)
+            except FileNotFoundError:
+                continue
+            with shard.lock:
+                for line in lines:
+                    try:
+                        values = line.decode().rstrip("\n").split(",", 4)
+                        user_id = values.pop()
+                        values = [float(x) for x in values]
+                    except (UnicodeDecodeError, ValueError, IndexError):
+                        continue
+                    if len(values) == 4:
+                        self._user(shard, user_id).append(*values, stress)
+
+    def _user(self, shard, user_id):
+        buffers = shard.users.get(user_id)
+        if buffers is None:
+            buffers = shard.users[user_id] = BiometricBuffers(self.capacity)
+        return buffers
+
+    def record(self, user_id, heart_rate, systolic_bp, diastolic_bp, body_temperature, stress=0.0):
+        """
+        Stores one webhook sample for user_id in memory and in its shard file.
+        Returns the generation of the user's buffers it was stored as.
+        """
+        user_id = user_id.replace("\n", " ")
+        shard = self._shard(user_id)
+        line = f"{heart_rate},{systolic_bp},{diastolic_bp},{body_temperature},{user_id}\n"
+        with shard.lock:
+            generation = self._user(shard, user_id).append(
+                heart_rate, systolic_bp, diastolic_bp, body_temperature, stress)
+            if self.writer is not None:
+                self.writer.write(shard.path, line)
+                return generation
+            if shard.file is None:
+                shard.file = open(shard.path, "a")
+            shard.file.write(line)
+            shard.file.flush()
+        return generation
+
+    def user(self, user_id):
+        """The user's BiometricBuffers, or None if no sample has been seen."""
+        shard = self._shard(user_id)
+        with shard.lock:
+            return shard.users.get(user_id)
+
+    def user_count(self):
+        return sum(len(shard.users) for shard in self._shards)
@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+
+
+class Conversation:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.size = sum(message_size(message) for message in self.messages)
+
+
+def message_size(message):
+    """Approximate bytes held by one message, for the memory cap."""
+    return len(str(message.content)) + 64
+
+
+class ConversationStore:
+    """
+    Server-side chat sessions keyed by the client's conversation id.
+
+    Each session keeps its message list and grows by one user and one
+    assistant message per turn, so clients only send the new turn. A turn
+    is only stored once its reply has finished streaming, so a failed or
+    abandoned stream leaves the session as it was. Every
+    session starts with the same system message object, so the prompt
+    prefix is identical across turns and conversations and the provider's
+    prompt cache can hit. Least recently used sessions are evicted past
+    `max_conversations` or `max_bytes` of message text; a client whose
+    session was evicted gets a miss and re-sends its full history once.
+    """
+
+    def __init__(self, max_conversations=1000, max_bytes=50_000_000):
+        self.max_conversations = max_conversations
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, conversation_id, messages):
+        """Creates (or replaces) a session from a full message list."""
+        conversation = Conversation(messages)
+        with self._lock:
+            old = self._conversations.pop(conversation_id, None)
+            if old is not None:
+                self.size -= old.size
+            self._conversations[conversation_id] = conversation
+            self.size += conversation.size
+            self._evict()
+        return list(conversation.messages)
+
+    def with_turn(self, conversation_id, message):
+        """
+        The session's messages followed by the user's new one, or None if
+        the session is unknown (never started or evicted). Nothing is stored;
+        add_turn() does that once the reply is complete.
+        """
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conversations.move_to_end(conversation_id)
+            return conversation.messages + [message]
+
+    def add_turn(self, conversation_id, messages, reply):
+        """Stores a finished turn: the messages it was answered from plus the reply."""
+        self.start(conversation_id, messages + [reply])
+
+    def _evict(self):
+        # Never evict the session that was just used, even if it alone is
+        # over the byte budget
+        while len(self._conversations) > 1 and (
+                len(self._conversations) > self.max_conversations or self.size > self.max_bytes):
+            _, conversation = self._conversations.popitem(last=False)
+            self.size -= conversation.size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "conversations": len(self._conversations),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
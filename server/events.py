@@ -0,0 +1,203 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+
+
+def format_sse(event, data, event_id=None):
+    """Encodes one Server-Sent Events message."""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+class Subscription:
+    """One connected client's bounded queue of pending messages."""
+
+    def __init__(self, max_queue):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def put(self, message):
+        """Queues a message; False if the client has fallen too far behind."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def messages(self, heartbeat=15):
+        """Yields encoded messages, with a keep-alive comment when idle."""
+        while not self.closed:
+            try:
+                yield self.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+
+
+class AsyncSubscription:
+    """
+    A subscriber served from an event loop, like the ASGI /stream. Publishers
+    run on other threads, so messages are handed to the loop, which queues
+    them; waiting for the next one costs no thread.
+    """
+
+    def __init__(self, max_queue):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def put(self, message):
+        if self.closed:
+            return False
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The loop has shut down
+            return False
+        return True
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind: end the stream so the client reconnects
+            self.closed = True
+
+    async def messages(self, heartbeat=15):
+        while not self.closed:
+            try:
+                yield await asyncio.wait_for(self.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+
+class EventBroker:
+    """
+    Fans out dashboard deltas to every /stream subscriber.
+
+    Each event is serialized once and pushed onto the subscribers' queues, so
+    the cost of an update is one encode plus a queue put per client. A client
+    that falls too far behind is disconnected; EventSource reconnects it and
+    it starts again from a fresh snapshot.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self.event_id = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        return self._add(Subscription(self.max_queue))
+
+    def subscribe_async(self):
+        """Subscribes from a coroutine, for clients served by the event loop."""
+        return self._add(AsyncSubscription(self.max_queue))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.closed = True
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data):
+        with self._lock:
+            self.event_id += 1
+            message = format_sse(event, data, self.event_id)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            if not subscription.put(message):
+                self.unsubscribe(subscription)
+
+
+class DeltaPublisher:
+    """
+    Publishes dashboard deltas from its own thread.
+
+    Producers (the Terra webhook, rule creation, the history watcher) hand
+    over the raw delta and return at once. This thread adds the fields from
+    `enrich()`, i.e. the latest prediction, which can mean loading torch or
+    waiting on the batcher, and fans the delta out. Deltas that queued up
+    while it was busy are merged and enriched once: `append` fields (new
+    history rows) are concatenated, the rest keep their latest value.
+    """
+
+    def __init__(self, broker, enrich, append=("history",)):
+        self.broker = broker
+        self.enrich = enrich
+        self.append = append
+        self.published = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return self
+
+    def publish(self, delta):
+        if not self.broker.subscriber_count():
+            return
+        self.start()
+        self._queue.put(delta)
+
+    def _run(self):
+        while True:
+            delta = self._queue.get()
+            while True:
+                try:
+                    delta = self._merge(delta, self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                delta.update(self.enrich())
+                self.broker.publish("delta", delta)
+                self.published += 1
+            except Exception as e:
+                print("Error publishing delta:", e)
+
+    def _merge(self, delta, newer):
+        for key, value in newer.items():
+            if key in self.append and key in delta:
+                delta[key] = delta[key] + value
+            else:
+                delta[key] = value
+        return delta
+
+
+def watch_history(store, on_rows, offset=None, interval=0.5):
+    """
+    Polls the append-only history file and calls on_rows with the rows
+    appended since `offset` (by default, since the watcher started). The
+    EMG writer is a separate process, so a size check is the cheapest way
+    to notice new samples. A file that doesn't exist yet is waited for, and
+    everything in it once it appears is new.
+    """
+    while True:
+        try:
+            if offset is None:
+                offset = store.end_offset()
+            rows, offset = store.read_from(offset)
+            if rows:
+                on_rows(rows)
+        except FileNotFoundError:
+            if offset is None:
+                offset = 0
+        except Exception as e:
+            print("Error watching history:", e)
+        time.sleep(interval)
@@ -0,0 +1,171 @@
+import bisect
+import math
+import re
+import threading
+
+import numpy as np
+
+from biometrics import RingBuffer
+
+# Columns of every level: start time of the bucket's first sample, min,
+# mean, max, time of its last sample, number of samples
+TIME, MIN, MEAN, MAX, END, COUNT = range(6)
+
+RANGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_range(text):
+    """Parses a range such as "90s", "15m", "1h" or "7d" (or plain seconds)."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", text)
+    if not match:
+        raise ValueError(f"Invalid range: {text}")
+    return float(match.group(1)) * RANGE_UNITS.get(match.group(2) or "s")
+
+
+def merge_buckets(rows, points):
+    """
+    Merges runs of consecutive [time, min, mean, max, end, count] rows so
+    that at most `points` remain, keeping each run's extremes (the coarsest
+    level may still have more buckets than the dashboard asked for).
+    """
+    step = -(-len(rows) // points) if points else len(rows)
+    if step <= 1:
+        return rows
+    starts = np.arange(0, len(rows), step)
+    counts = np.add.reduceat(rows[:, COUNT], starts)
+    return np.column_stack((
+        rows[starts, TIME],
+        np.minimum.reduceat(rows[:, MIN], starts),
+        np.add.reduceat(rows[:, MEAN] * rows[:, COUNT], starts) / counts,
+        np.maximum.reduceat(rows[:, MAX], starts),
+        np.maximum.reduceat(rows[:, END], starts),
+        counts))
+
+
+class _Bucket:
+    """Running min/mean/max of the level below within one time slot."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.slot = None
+        self.count = 0
+        self.start = None
+        self.end = None
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def add(self, start, low, mean, high, end, count):
+        if self.count == 0:
+            self.start = start
+        self.end = end
+        self.count += count
+        self.total += mean * count
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    def row(self):
+        return [self.start, self.min, self.total / self.count, self.max, self.end, self.count]
+
+
+class HistoryPyramid:
+    """
+    Multi-resolution copy of the EMG history for long dashboard ranges.
+
+    Level 0 holds raw samples and every level above it holds min/mean/max
+    buckets over fixed, aligned time slots: `resolution` seconds at level 1
+    and `factor` times longer at each level above (1s, 10s, 100s by
+    default). A bucket never spans more than its slot, so samples either
+    side of a gap in the recording land in different buckets. Buckets are
+    completed incrementally as samples arrive, and each level is a bounded
+    ring buffer, so a query over any range reads at most a few hundred
+    buckets from the coarsest level that still has enough points, never the
+    raw samples.
+    """
+
+    def __init__(self, factor=10, levels=4, capacity=10000, resolution=1.0):
+        self.factor = factor
+        # Slot length of the buckets that level i + 1 is built from
+        self.widths = [resolution * factor ** i for i in range(levels - 1)]
+        self.levels = [RingBuffer(capacity, width=6) for _ in range(levels)]
+        self._pending = [_Bucket() for _ in range(levels - 1)]
+        self._lock = threading.Lock()
+
+    def extend(self, rows):
+        """Adds [time, stress] rows, which must arrive in time order."""
+        with self._lock:
+            for timestamp, value in rows:
+                self._add(0, [timestamp, value, value, value, timestamp, 1])
+
+    def _add(self, level, row):
+        self.levels[level].append(row)
+        if level + 1 == len(self.levels):
+            return
+        bucket = self._pending[level]
+        # Slots of each level nest in those of the level above, so a whole
+        # bucket of this level falls in one slot of the next
+        slot = math.floor(row[TIME] / self.widths[level])
+        if bucket.count and slot != bucket.slot:
+            self._add(level + 1, bucket.row())
+            bucket.reset()
+        bucket.slot = slot
+        bucket.add(*row)
+
+    def _partial(self, level):
+        """
+        The still-open bucket of `level`, merged from the pending buckets
+        below it, so the newest samples show up at every resolution. They
+        all lie in the newest slot of `level`.
+        """
+        merged = _Bucket()
+        # Oldest first: each pending bucket holds what came after the one above it
+        for below in reversed(range(level)):
+            bucket = self._pending[below]
+            if bucket.count:
+                merged.add(*bucket.row())
+        if merged.count == 0:
+            return None
+        return merged.row()
+
+    def _bounds(self, level, since, until):
+        buffer = self.levels[level]
+        size = len(buffer)
+        def key(i): return buffer.value(i, TIME)
+        # The first bucket that ends at or after `since`, which may have
+        # started before it, but no earlier than one slot before it
+        start = bisect.bisect_right(range(size), since, key=key) - 1
+        if start < 0 or buffer.value(start, END) < since:
+            start += 1
+        end = bisect.bisect_right(range(size), until, key=key)
+        return start, end
+
+    def query(self, since, until, points=200):
+        """
+        Returns at most `points` [time, min, mean, max] rows covering
+        since <= time <= until, from the finest level that fits.
+        """
+        with self._lock:
+            chosen = None
+            for level, buffer in enumerate(self.levels):
+                if not len(buffer):
+                    break
+                start, end = self._bounds(level, since, until)
+                # A level that no longer reaches back to `since` would
+                # silently truncate the range, so only use it if it covers it.
+                covers = buffer.value(0, TIME) <= since or len(buffer) < buffer.capacity
+                if covers or chosen is None:
+                    chosen = (level, start, end)
+                if covers and end - start <= points:
+                    break
+            if chosen is None:
+                return []
+            level, start, end = chosen
+            rows = self.levels[level].rows(start, end).tolist()
+            partial = self._partial(level)
+            if partial is not None and partial[TIME] <= until and partial[END] >= since:
+                rows.append(partial)
+
+        rows = merge_buckets(np.array(rows, dtype=np.float64).reshape(-1, 6), points)
+        return rows[:, :END].tolist()
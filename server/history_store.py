@@ -0,0 +1,165 @@
+import os
+
+# Size of the blocks read when scanning backwards from the end of the file.
+BLOCK_SIZE = 64 * 1024
+
+
+def complete_size(file):
+    """Offset just past the last newline, ignoring a partially written line."""
+    size = os.fstat(file.fileno()).st_size
+    pos = size
+    while pos > 0:
+        read_from = max(0, pos - BLOCK_SIZE)
+        file.seek(read_from)
+        block = file.read(pos - read_from)
+        newline = block.rfind(b"\n")
+        if newline != -1:
+            return read_from + newline + 1
+        pos = read_from
+    return 0
+
+
+def read_lines_backward(file, start, end, n):
+    """Returns up to the last n lines between the start and end offsets."""
+    chunks = []
+    newlines = 0
+    pos = end
+    while pos > start and newlines <= n:
+        read_from = max(start, pos - BLOCK_SIZE)
+        file.seek(read_from)
+        block = file.read(pos - read_from)
+        newlines += block.count(b"\n")
+        chunks.append(block)
+        pos = read_from
+    lines = b"".join(reversed(chunks)).splitlines()
+    return lines[-n:] if n else []
+
+
+def tail_lines(path, n):
+    """Returns the last n complete lines of a file as bytes, without reading all of it."""
+    with open(path, "rb") as file:
+        return read_lines_backward(file, 0, complete_size(file), n)
+
+
+class HistoryStore:
+    """
+    Read side of the append-only EMG history file written by emg/read_data.py.
+
+    Each line is "timestamp rolling_avg raw" and timestamps never go backwards,
+    so the file is already sorted. Tail reads seek from the end and range
+    queries bisect on byte offsets, so neither depends on how large the file
+    has grown.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, timestamp, rolling_avg, raw):
+        """Appends a single sample in the same format as the EMG reader."""
+        with open(self.path, "a") as file:
+            file.write(f"{int(timestamp)} {rolling_avg:.2f} {raw}\n")
+
+    def generation(self):
+        """
+        Changes whenever a sample is appended. The file only grows, so its
+        size works as a counter that the EMG writer bumps on every write.
+        """
+        return os.stat(self.path).st_size
+
+    def line_count(self):
+        """Number of complete lines, by counting newlines a block at a time."""
+        count = 0
+        with open(self.path, "rb") as file:
+            remaining = complete_size(file)
+            file.seek(0)
+            while remaining > 0:
+                block = file.read(min(BLOCK_SIZE, remaining))
+                count += block.count(b"\n")
+                remaining -= len(block)
+        return count
+
+    def end_offset(self):
+        """Offset just past the last complete line."""
+        with open(self.path, "rb") as file:
+            return complete_size(file)
+
+    def read_from(self, offset):
+        """
+        Returns ([time, stress] rows appended after offset, new offset), for
+        following the file as it grows.
+        """
+        with open(self.path, "rb") as file:
+            size = complete_size(file)
+            if size <= offset:
+                return [], offset
+            file.seek(offset)
+            lines = file.read(size - offset).splitlines()
+        return self._parse(lines), size
+
+    def tail(self, n=10):
+        """Returns the last n rows as [time, stress] pairs."""
+        return self.query(limit=n)
+
+    def tail_with_offset(self, n):
+        """The last n rows and the offset just past them, to follow on with read_from()."""
+        with open(self.path, "rb") as file:
+            size = complete_size(file)
+            lines = read_lines_backward(file, 0, size, n)
+        return self._parse(lines), size
+
+    def query(self, since=None, until=None, limit=None):
+        """
+        Returns [time, stress] pairs with since <= time <= until.
+
+        Either bound may be None to leave that side open. If limit is given,
+        only the most recent `limit` rows of the range are returned.
+        """
+        with open(self.path, "rb") as file:
+            size = complete_size(file)
+            start = 0 if since is None else self._bisect(file, size, since, False)
+            end = size if until is None else self._bisect(file, size, until, True)
+            if start >= end:
+                return []
+            if limit is None:
+                file.seek(start)
+                lines = file.read(end - start).splitlines()
+            else:
+                lines = read_lines_backward(file, start, end, limit)
+        return self._parse(lines)
+
+    def _parse(self, lines):
+        rows = []
+        for line in lines:
+            parts = line.split()
+            if len(parts) >= 2:
+                rows.append([float(parts[0]), float(parts[1])])
+        return rows
+
+    def _line_start(self, file, offset):
+        """Offset of the first line that starts at or after offset."""
+        if offset == 0:
+            return 0
+        file.seek(offset - 1)
+        file.readline()
+        return file.tell()
+
+    def _bisect(self, file, size, target, after):
+        """
+        Offset of the first line whose timestamp is >= target, or > target
+        when after is True. Returns size if there is no such line.
+        """
+        lo, hi = 0, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self._line_start(file, mid)
+            if start >= size:
+                hi = mid
+                continue
+            file.seek(start)
+            parts = file.readline().split(maxsplit=1)
+            timestamp = float(parts[0]) if parts else float("-inf")
+            if timestamp > target or (timestamp == target and not after):
+                hi = mid
+            else:
+                lo = mid + 1
+        return self._line_start(file, lo) if lo < size else size
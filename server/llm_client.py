@@ -0,0 +1,278 @@
+import asyncio
+import bisect
+import os
+import random
+import threading
+import time
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf")]
+
+
+class LatencyHistogram:
+    """Counts of call latencies per bucket, per endpoint."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self._counts = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, latency_ms):
+        with self._lock:
+            counts = self._counts.setdefault(name, [0] * len(self.buckets))
+            counts[bisect.bisect_left(self.buckets, latency_ms)] += 1
+            self._totals[name] = self._totals.get(name, 0.0) + latency_ms
+
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for name, counts in self._counts.items():
+                calls = sum(counts)
+                stats[name] = {
+                    "calls": calls,
+                    "avg_ms": self._totals[name] / calls,
+                    "p50_ms": self._quantile(counts, calls, 0.5),
+                    "p99_ms": self._quantile(counts, calls, 0.99),
+                    "buckets": {f"<={bound:g}": count
+                                for bound, count in zip(self.buckets, counts) if count}
+                }
+            return stats
+
+    def _quantile(self, counts, calls, q):
+        """Upper bound of the bucket holding the q-th call."""
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= q * calls:
+                return bound
+        return self.buckets[-1]
+
+
+def backoff_delay(attempt, response=None, base=0.5, cap=8.0):
+    """
+    Full-jitter exponential backoff, or the server's Retry-After if it sent
+    one, so retrying clients spread out instead of hitting the API together.
+    """
+    if response is not None:
+        try:
+            return min(cap, float(response.headers["retry-after"]))
+        except (KeyError, ValueError):
+            pass
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that gives back its concurrency slot once it is closed."""
+
+    def __init__(self, stream, release):
+        self.stream = stream
+        self.release = release
+
+    def __iter__(self):
+        yield from self.stream
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            if self.release:
+                self.release()
+                self.release = None
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, release):
+        self.stream = stream
+        self.release = release
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            if self.release:
+                self.release()
+                self.release = None
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """
+    Keep-alive transport that limits how many requests are in flight, retries
+    transient failures with jittered backoff and records latency. A slot is
+    held until the response body is closed, so streamed completions count
+    for as long as they are streaming.
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.slots = threading.BoundedSemaphore(client.max_concurrency)
+
+    def handle_request(self, request):
+        self.slots.acquire()
+        # Latency is measured from when the request gets a slot, so it
+        # reflects the API, not our own queueing
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.client.max_retries + 1):
+                response = None
+                try:
+                    response = super().handle_request(request)
+                except httpx.TransportError:
+                    if attempt == self.client.max_retries:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUS or attempt == self.client.max_retries:
+                        break
+                    response.close()
+                self.client.retries += 1
+                time.sleep(backoff_delay(attempt, response))
+        except BaseException:
+            self.slots.release()
+            raise
+        self.client.latency.record(request.url.path, (time.perf_counter() - started) * 1000)
+        response.stream = _ReleasingStream(response.stream, self.slots.release)
+        return response
+
+
+class AsyncPooledTransport(httpx.AsyncBaseTransport):
+    """
+    Async counterpart of PooledTransport.
+
+    asyncio connections and semaphores belong to the event loop they were
+    created on, so each running loop gets its own connection pool and its
+    own `max_concurrency` slots. A model can then be awaited from the
+    server's loop and from separate asyncio.run() calls without reusing a
+    connection from a closed loop. Pools of closed loops are dropped.
+    """
+
+    def __init__(self, client, **kwargs):
+        self.client = client
+        self.kwargs = kwargs
+        self._loops = {}
+        self._lock = threading.Lock()
+
+    def _for_loop(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.get(loop)
+            if state is None:
+                for closed in [other for other in self._loops if other.is_closed()]:
+                    del self._loops[closed]
+                state = self._loops[loop] = (httpx.AsyncHTTPTransport(**self.kwargs),
+                                             asyncio.BoundedSemaphore(self.client.max_concurrency))
+            return state
+
+    async def handle_async_request(self, request):
+        transport, slots = self._for_loop()
+        await slots.acquire()
+        # Latency is measured from when the request gets a slot, so it
+        # reflects the API, not our own queueing
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.client.max_retries + 1):
+                response = None
+                try:
+                    response = await transport.handle_async_request(request)
+                except httpx.TransportError:
+                    if attempt == self.client.max_retries:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUS or attempt == self.client.max_retries:
+                        break
+                    await response.aclose()
+                self.client.retries += 1
+                await asyncio.sleep(backoff_delay(attempt, response))
+        except BaseException:
+            slots.release()
+            raise
+        self.client.latency.record(request.url.path, (time.perf_counter() - started) * 1000)
+        response.stream = _AsyncReleasingStream(response.stream, slots.release)
+        return response
+
+    async def aclose(self):
+        """Closes the pool of the calling loop; the others can't be closed from here."""
+        with self._lock:
+            state = self._loops.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state[0].aclose()
+
+
+class LLMClient:
+    """
+    One HTTP stack for every OpenAI call in the process.
+
+    The chat endpoint and the monitor loop both build their chat models from
+    here, so they share keep-alive connections (HTTP/2 when h2 is installed)
+    instead of each opening their own, and are held to one concurrency limit
+    and retry policy. OPENAI_BASE_URL points everything at another server,
+    such as bench/stub_llm.py.
+
+    A streamed completion holds its slot until it finishes, so
+    `max_concurrency` (OPENAI_MAX_CONCURRENCY) is also the number of /ask
+    chats that can generate at once; the rest wait for a slot. Size it to
+    the provider's rate limit rather than to protect the server.
+    """
+
+    def __init__(self, base_url=None, max_connections=None, max_concurrency=None,
+                 max_retries=3, timeout=60.0):
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.max_concurrency = max_concurrency or int(os.getenv("OPENAI_MAX_CONCURRENCY", 64))
+        max_connections = max_connections or self.max_concurrency
+        self.max_retries = max_retries
+        self.retries = 0
+        self.latency = LatencyHistogram()
+
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_connections,
+                              keepalive_expiry=60)
+        self.http_client = httpx.Client(
+            transport=PooledTransport(self, limits=limits, http2=HTTP2), timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(
+            transport=AsyncPooledTransport(self, limits=limits, http2=HTTP2), timeout=timeout)
+
+    def chat_model(self, **kwargs):
+        """A ChatOpenAI that sends its requests through the shared pool."""
+        # langchain_openai pulls in the whole openai SDK, about a second of
+        # import time, so only pay for it when a model is actually built
+        from langchain_openai import ChatOpenAI
+
+        if self.base_url:
+            kwargs.setdefault("base_url", self.base_url)
+        return ChatOpenAI(
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            # Retries happen in the transport, with jitter and one shared budget
+            max_retries=0,
+            **kwargs
+        )
+
+    def stats(self):
+        return {"http2": HTTP2, "retries": self.retries, "latency": self.latency.stats()}
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_client():
+    """The process-wide LLMClient, created on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = LLMClient()
+        return _shared
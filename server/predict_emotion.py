@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+import os
+import threading
+
 import numpy as np
 import torch
 import torch.nn as nn
@@ -28,9 +31,12 @@ class LSTMClassifier(nn.Module):
         return out
 
 
+# Model files live next to this module, whatever the working directory
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # Load emotion labels mapping
 try:
-    emotion_labels = np.load("emotion_labels.npy", allow_pickle=True).tolist()
+    emotion_labels = np.load(os.path.join(MODEL_DIR, "emotion_labels.npy"), allow_pickle=True).tolist()
 except Exception:
     emotion_labels = ["fear", "anger", "sadness", "normal"]
 
@@ -40,11 +46,45 @@ model = LSTMClassifier(input_dim=4, hidden_dim=32,
                        num_layers=1, num_classes=num_classes)
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 model.load_state_dict(torch.load(
-    "lstm_emotion_model.pth", map_location=device))
+    os.path.join(MODEL_DIR, "lstm_emotion_model.pth"), map_location=device))
 model.to(device)
 model.eval()
 
 
+def build_sequence(stress, bpm, blood_pressure, temperature):
+    """
+    Validates the 4 feature lists and returns them as a (10, 4) float32 array.
+    """
+    # Validate input lengths
+    if not (len(stress) == len(bpm) == len(blood_pressure) == len(temperature) == 10):
+        raise ValueError("Each input list must be of length 10.")
+
+    # Construct the feature matrix of shape (10, 4)
+    return np.array((stress, bpm, blood_pressure, temperature), dtype=np.float32).T
+
+
+def predict_emotion_batch(sequences):
+    """
+    Accepts a sequence of (10, 4) feature matrices, as returned by
+    build_sequence, and classifies all of them in a single forward pass.
+
+    Returns the predicted emotions as a list of strings.
+    """
+    if len(sequences) == 0:
+        return []
+
+    # Stack into a (batch, 10, 4) tensor
+    sequence_tensor = torch.from_numpy(
+        np.stack(sequences).astype(np.float32, copy=False)).to(device)
+
+    # Make prediction
+    with torch.no_grad():
+        outputs = model(sequence_tensor)
+        _, predicted_classes = torch.max(outputs, 1)
+
+    return [emotion_labels[i] for i in predicted_classes.tolist()]
+
+
 def predict_emotion(stress, bpm, blood_pressure, temperature):
     """
     Accepts 4 lists (each of length 10) representing:
@@ -55,24 +95,84 @@ def predict_emotion(stress, bpm, blood_pressure, temperature):
 
     Returns the predicted emotion as a string.
     """
-    # Validate input lengths
-    if not (len(stress) == len(bpm) == len(blood_pressure) == len(temperature) == 10):
-        raise ValueError("Each input list must be of length 10.")
+    sequence = build_sequence(stress, bpm, blood_pressure, temperature)
+    return predict_emotion_batch([sequence])[0]
 
-    # Construct the feature matrix of shape (10, 4)
-    sequence = np.column_stack((stress, bpm, blood_pressure, temperature))
-    # Add batch dimension -> (1, 10, 4)
-    sequence = np.expand_dims(sequence, axis=0)
 
-    # Convert to torch tensor
-    sequence_tensor = torch.tensor(sequence, dtype=torch.float32).to(device)
+def _sigmoid(x):
+    # tanh form avoids overflow in exp for large unnormalized inputs
+    return 0.5 * (np.tanh(0.5 * x) + 1)
 
-    # Make prediction
-    with torch.no_grad():
-        outputs = model(sequence_tensor)
-        _, predicted_class = torch.max(outputs, 1)
 
-    return emotion_labels[predicted_class.item()]
+# The LSTM and output layer weights as NumPy arrays, for StreamingPredictor
+_layers = []
+for _layer in range(model.num_layers):
+    _layers.append((
+        getattr(model.lstm, f"weight_ih_l{_layer}").detach().cpu().numpy().T,
+        getattr(model.lstm, f"weight_hh_l{_layer}").detach().cpu().numpy().T,
+        (getattr(model.lstm, f"bias_ih_l{_layer}") +
+         getattr(model.lstm, f"bias_hh_l{_layer}")).detach().cpu().numpy()))
+_fc_weight = model.fc.weight.detach().cpu().numpy().T
+_fc_bias = model.fc.bias.detach().cpu().numpy()
+
+
+class StreamingPredictor:
+    """
+    Incremental predictions for one user's stream of samples.
+
+    A full-window prediction starts the LSTM from zeros at the oldest of the
+    last `window` samples. This keeps the hidden state of each window that
+    is still filling up (one started at every sample, in a fixed ring of
+    slots) and advances all of them by the new sample in one batched step.
+    The oldest one is complete once it has seen `window` samples, and its
+    label matches predict_emotion() on that window.
+
+    Each sample still advances `window` hidden states, the same arithmetic
+    as recomputing the window. What is saved is the overhead: the step is a
+    few small NumPy products with the loaded model's weights, where a
+    forward pass through torch costs far more in per-call overhead than in
+    arithmetic at this model size.
+    """
+
+    def __init__(self, window=10):
+        self.window = window
+        self.count = 0
+        self._h = np.zeros((model.num_layers, window, model.hidden_dim), dtype=np.float32)
+        self._c = np.zeros_like(self._h)
+        self._lock = threading.Lock()
+
+    def push(self, stress, bpm, blood_pressure, temperature):
+        """
+        Adds one sample. Returns the predicted emotion for the window ending
+        at this sample, or None until `window` samples have been seen.
+        """
+        x = np.array([stress, bpm, blood_pressure, temperature], dtype=np.float32)
+        hidden = model.hidden_dim
+        with self._lock:
+            # Start a new window in the slot the oldest one just vacated.
+            slot = self.count % self.window
+            self._h[:, slot] = 0
+            self._c[:, slot] = 0
+
+            # Advance every pending window by this one timestep.
+            layer_input = x
+            for layer, (w_ih, w_hh, bias) in enumerate(_layers):
+                gates = layer_input @ w_ih + self._h[layer] @ w_hh + bias
+                i = _sigmoid(gates[:, :hidden])
+                f = _sigmoid(gates[:, hidden:2 * hidden])
+                g = np.tanh(gates[:, 2 * hidden:3 * hidden])
+                o = _sigmoid(gates[:, 3 * hidden:])
+                self._c[layer] = f * self._c[layer] + i * g
+                self._h[layer] = o * np.tanh(self._c[layer])
+                layer_input = self._h[layer]
+
+            self.count += 1
+            if self.count < self.window:
+                return None
+            # The window started window - 1 samples ago is now complete.
+            oldest = self.count % self.window
+            outputs = self._h[-1, oldest] @ _fc_weight + _fc_bias
+        return emotion_labels[int(np.argmax(outputs))]
 
 
 # # Example usage:
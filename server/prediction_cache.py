@@ -0,0 +1,48 @@
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    LRU memo for model predictions.
+
+    Keys are the generation counters of the data the prediction reads, so a
+    new sample anywhere changes the key and the stale entry simply ages out.
+    Repeated polls between samples become a dictionary lookup.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for key, calling compute() on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Exceptions propagate and are not cached.
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
@@ -0,0 +1,138 @@
+import bisect
+import os
+import sys
+
+import numpy as np
+
+# One EMG sample: unix timestamp, rolling average, raw reading. emg/read_data.py
+# packs the same 16-byte little-endian layout with struct format "<qff".
+SAMPLE_DTYPE = np.dtype([("time", "<i8"), ("rolling_avg", "<f4"), ("raw", "<f4")])
+
+
+class SampleLog:
+    """
+    Fixed-record binary log of EMG samples, the binary counterpart of
+    history.txt.
+
+    Records are appended in timestamp order, so the file can be memory-mapped
+    and range reads become bisects plus a slice of the mapping instead of
+    parsing text. It has HistoryStore's read interface, so the server can
+    read either one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, timestamp, rolling_avg, raw):
+        record = np.array([(timestamp, rolling_avg, raw)], dtype=SAMPLE_DTYPE)
+        with open(self.path, "ab") as file:
+            file.write(record.tobytes())
+
+    def generation(self):
+        """Changes whenever a sample is appended, like HistoryStore.generation()."""
+        return os.stat(self.path).st_size
+
+    def end_offset(self):
+        """Offset just past the last complete record."""
+        return os.path.getsize(self.path) // SAMPLE_DTYPE.itemsize * SAMPLE_DTYPE.itemsize
+
+    def read_from(self, offset):
+        """Returns ([time, stress] rows appended after offset, new offset)."""
+        samples = self.samples()[offset // SAMPLE_DTYPE.itemsize:]
+        return _rows(samples), offset + len(samples) * SAMPLE_DTYPE.itemsize
+
+    def covers(self, store):
+        """
+        True if the log holds every sample of the text history `store`: at
+        least as many records as it has complete lines, with the record for
+        its last line at the same timestamp. The EMG reader creates the log
+        empty, so until history.txt has been converted (see convert() below)
+        the log is missing older samples.
+        """
+        try:
+            lines = store.line_count()
+            last = store.tail(1)
+        except FileNotFoundError:
+            return True
+        if not lines:
+            return True
+        samples = self.samples()
+        return len(samples) >= lines and bool(last) and samples[lines - 1]["time"] == last[-1][0]
+
+    def samples(self):
+        """Read-only memmap over every complete record in the log."""
+        count = os.path.getsize(self.path) // SAMPLE_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        return np.memmap(self.path, dtype=SAMPLE_DTYPE, mode="r", shape=(count,))
+
+    def range(self, since=None, until=None):
+        """Zero-copy slice of the records with since <= time <= until."""
+        samples = self.samples()
+        times = samples["time"]
+        # bisect on the strided view reads a handful of elements, where
+        # np.searchsorted would first copy the whole column.
+        start = 0 if since is None else bisect.bisect_left(times, since)
+        end = len(samples) if until is None else bisect.bisect_right(times, until)
+        return samples[start:max(start, end)]
+
+    def downsample(self, since=None, until=None, points=10):
+        """Up to `points` evenly spaced records from the range, as a strided view."""
+        samples = self.range(since, until)
+        step = max(1, -(-len(samples) // points))
+        return samples[::step]
+
+    def query(self, since=None, until=None, limit=None):
+        """Same contract as HistoryStore.query: [time, stress] pairs."""
+        samples = self.range(since, until)
+        if limit is not None:
+            samples = samples[len(samples) - min(limit, len(samples)):]
+        return _rows(samples)
+
+    def tail(self, n=10):
+        return self.query(limit=n)
+
+    def tail_with_offset(self, n):
+        """The last n rows and the offset just past them, to follow on with read_from()."""
+        samples = self.samples()
+        return _rows(samples[max(0, len(samples) - n):]), len(samples) * SAMPLE_DTYPE.itemsize
+
+
+def _rows(samples):
+    # rolling_avg is float32; round it to the 2 decimals history.txt keeps so
+    # that 213.33 doesn't come back as 213.3300018310547
+    return np.column_stack((samples["time"],
+                            samples["rolling_avg"].astype(np.float64).round(2))).tolist()
+
+
+def parse_history_lines(lines):
+    """Parses "timestamp rolling_avg raw" lines into records, skipping bad ones."""
+    records = []
+    for line in lines:
+        parts = line.split()
+        if len(parts) < 3:
+            continue
+        try:
+            records.append((int(float(parts[0])), float(parts[1]), float(parts[2])))
+        except ValueError:
+            continue
+    return np.array(records, dtype=SAMPLE_DTYPE)
+
+
+def convert(text_path, log_path, chunk_lines=100000):
+    """Converts an existing history.txt into a binary sample log."""
+    written = 0
+    with open(text_path, "r") as text, open(log_path, "wb") as log:
+        while True:
+            lines = text.readlines(chunk_lines * 32)
+            if not lines:
+                break
+            records = parse_history_lines(lines)
+            log.write(records.tobytes())
+            written += len(records)
+    return written
+
+
+if __name__ == "__main__":
+    # Usage: python sample_log.py history.txt history.bin
+    print(f"Wrote {convert(sys.argv[1], sys.argv[2])} samples to {sys.argv[2]}")
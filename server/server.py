@@ -1,7 +1,9 @@
+import asyncio
+import atexit
 import numpy as np
 from collections import defaultdict
-import random
 import json
+import os
 import flask
 from threading import Thread
 from time import sleep
@@ -9,39 +11,86 @@ from time import sleep
 from typing import Dict, List
 
 from dotenv import load_dotenv
-from flask import Flask, Response, jsonify, request
+from flask import Blueprint, Flask, Response, jsonify, request
 from flask_cors import CORS
 from pydantic import BaseModel, Field
 
-from langchain_openai import ChatOpenAI
-from langchain_community.tools import BaseTool
-from langchain.prompts import PromptTemplate
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from langgraph.prebuilt import create_react_agent
-from terra.base_client import Terra
-import requests
+# langchain, langgraph, langchain_openai, terra and torch are imported where
+# they are first needed (see build_agent, terra_client and batcher.py), so
+# importing this module takes a fraction of a second.
 import threading
 import time
 import logging
-from predict_emotion import predict_emotion
+from batcher import MicroBatcher, StreamingPredictions
+from history_store import HistoryStore
+from sample_log import SampleLog
+from history_pyramid import HistoryPyramid, parse_range
+from biometrics import BiometricCache, ShardedBiometrics
+from prediction_cache import PredictionCache
+from events import DeltaPublisher, EventBroker, format_sse, watch_history
+from llm_client import shared_client
+from conversations import ConversationStore
+from write_behind import WriteBehindWriter
+import terra_payload
+from simulator import simulator_from_env
 
 logging.basicConfig(level=logging.INFO)
 _LOGGER = logging.getLogger("app")
 
-terra = Terra(api_key="t0PMr4YpxCVtYc0M7bYGSpBuRwujEPvp", dev_id="4actk-aimommy-testing-ntJJIlrzqJ",
-              secret="1a1e999f0665aeda4cf5a92335bce2cf4450f3a34fbb7273")
+_terra = None
+
+
+def terra_client():
+    """The Terra API client, created on first use."""
+    global _terra
+    if _terra is None:
+        from terra.base_client import Terra
+        _terra = Terra(api_key="t0PMr4YpxCVtYc0M7bYGSpBuRwujEPvp", dev_id="4actk-aimommy-testing-ntJJIlrzqJ",
+                       secret="1a1e999f0665aeda4cf5a92335bce2cf4450f3a34fbb7273")
+    return _terra
 
 
 # --- File Paths ---
 HISTORY_FILE = "history.txt"  # Change this to the actual file path
+HISTORY_LOG_FILE = "history.bin"  # Binary copy of HISTORY_FILE, see sample_log.py
 RULES_FILE = "rules.json"      # Change this to the actual file path
 HEART_RATE_FILE = "heart_rate.txt"
 BLOOD_PRESSURE_FILE = "blood_pressure.txt"
 BODY_TEMPERATURE_FILE = "body_temperature.txt"
-
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
-app.config['CORS_HEADERS'] = 'Content-Type'
+USER_BIOMETRICS_DIR = "biometrics"
+# The wearable shown on the dashboard; its samples stay in the files above
+# and every other Terra user goes to the sharded per-user store.
+DEFAULT_USER = os.getenv("DEFAULT_TERRA_USER", "test_user")
+
+history_store = HistoryStore(HISTORY_FILE)
+sample_log = SampleLog(HISTORY_LOG_FILE)
+# The one store every reader of the EMG history uses: read_history, the
+# /stream watcher and the pyramid. create_app() switches it to the binary
+# log if the EMG reader is writing one that has every sample.
+history_source = history_store
+history_pyramid = HistoryPyramid(factor=10, levels=4, capacity=10000)
+# Webhook samples are written to disk off the request thread, in batches.
+biometrics_writer = WriteBehindWriter(
+    fsync=os.getenv("BIOMETRICS_FSYNC", "interval"))
+biometric_cache = BiometricCache(
+    HEART_RATE_FILE, BLOOD_PRESSURE_FILE, BODY_TEMPERATURE_FILE,
+    writer=biometrics_writer)
+user_biometrics = ShardedBiometrics(USER_BIOMETRICS_DIR, writer=biometrics_writer)
+prediction_batcher = MicroBatcher(max_batch_size=32, max_wait_ms=5)
+prediction_cache = PredictionCache(max_entries=4096)
+# Each user's prediction, advanced by ingest_sample as samples arrive
+streaming_predictions = StreamingPredictions()
+# Latest EMG rolling average, kept up to date by publish_history so that
+# ingest_sample can stamp samples with it without reading the history file
+current_stress = 0.0
+event_broker = EventBroker()
+# delta_extras (defined below) adds the prediction to every /stream delta
+delta_publisher = DeltaPublisher(event_broker, lambda: delta_extras())
+# Bumped whenever rules.json is rewritten so /stream clients can refetch.
+rules_version = 0
+
+# The routes; create_app() builds the Flask app around them
+routes = Blueprint("server", __name__)
 
 load_dotenv()
 
@@ -66,6 +115,7 @@ class MonitoringRule(BaseModel):
 
 def create_monitoring_rule(rule: MonitoringRule):
     """Adds a new monitoring rule to the rules.json file."""
+    global rules_version
     rules = read_monitoring_rules()
 
     print("------------------------------------------")
@@ -78,7 +128,9 @@ def create_monitoring_rule(rule: MonitoringRule):
     try:
         with open(RULES_FILE, "w") as file:
             json.dump(rules, file, indent=4)
-            return "\n**Monitoring rule created successfully.**\n\n"
+        rules_version += 1
+        publish_delta(rules=rules)
+        return "\n**Monitoring rule created successfully.**\n\n"
     except Exception as e:
         return f"\n**Error creating monitoring rule: {e}**\n\n"
 
@@ -97,12 +149,9 @@ def read_monitoring_rules():
         return []
 
 
-def read_history():
+def read_history(since=None, until=None, limit=10):
     print("rh")
-    with open(HISTORY_FILE, "r") as file:
-        data = [[float(x) for x in line.strip().split()[:2]] for line in file]
-
-    recent_data = data[-10:]
+    recent_data = history_source.query(since=since, until=until, limit=limit)
 
     # # print("Data: ", data)
 
@@ -119,26 +168,44 @@ def read_history():
     return recent_data
 
 
-def gen_prediction():
+def biometrics_for(user=None):
+    """The user's biometric buffers, or None for a user we have no samples from."""
+    if user is None or user == DEFAULT_USER:
+        return biometric_cache
+    return user_biometrics.user(user)
+
+
+def gen_prediction(user=None):
     try:
-        # Load the last 10 data points for each of the 4 features
-        # stress, heart_rate, blood_pressure, temperature
-        stressData = read_history()
-        biometrics = get_bio_data()
-        stress = [x[1] for x in stressData]
-        heart_rate = [x["rate"] for x in biometrics["heart_rate"]][-10:]
-        blood_pressure = [biometrics["blood_pressure_high"]] * 10
-        temperature = [biometrics["body_temperature"]] * 10
-
-        # Make a prediction
-        prediction = predict_emotion(
-            stress, heart_rate, blood_pressure, temperature)
-        return prediction
+        buffers = biometrics_for(user)
+        if buffers is None:
+            return None
+        # Computed as the sample arrived, when the worker has caught up
+        label = streaming_predictions.latest(user or DEFAULT_USER, buffers.generation)
+        if label is not None:
+            return label
+        # The same label from the whole window. The inputs only change when
+        # a sample is added, so key the cached prediction on the generation.
+        key = (user, buffers.generation)
+        return prediction_cache.get_or_compute(key, lambda: compute_prediction(buffers))
     except Exception as e:
         print("Error generating prediction:", e)
         return str(e)
 
 
+def compute_prediction(buffers):
+    # The last 10 samples of the 4 features: stress, heart_rate,
+    # blood_pressure, temperature. The EMG sensor is local and has no user
+    # id, so each sample carries the stress level current when it arrived.
+    features, _ = buffers.features(10)
+    if len(features) < 10:
+        # A wearable that has only just started reporting
+        return None
+
+    # Make a prediction
+    return prediction_batcher.predict(*features.T)
+
+
 # def read_history():
 #     # File formatted as "time stress" per line
 #     with open(HISTORY_FILE, "r") as file:
@@ -152,33 +219,119 @@ def gen_prediction():
 # --- Legacy endpoints remain unchanged ---
 
 
-@app.route('/')
+@routes.route('/')
 def hello_world():
     return 'Hello, World!'
 
 
-@app.route("/history", methods=["GET"])
+@routes.route("/history", methods=["GET"])
 def get_history():
     print("Getting history rahhh")
     try:
-        data = read_history()
-        biometrics = get_bio_data()
-
-        data = [{"time": time, "stress": stress} for time, stress in data]
+        user = request.args.get("user")
+        biometrics = get_bio_data(user)
+        if biometrics is None:
+            return jsonify({"error": f"Unknown user {user}"}), 404
+
+        if "range" in request.args:
+            # Long ranges are answered from the downsampled pyramid,
+            # e.g. /history?range=1h&points=200
+            now = time.time()
+            rows = history_pyramid.query(
+                now - parse_range(request.args["range"]), now,
+                request.args.get("points", 200, type=int))
+            data = [{"time": t, "stress": mean, "min": low, "max": high}
+                    for t, low, mean, high in rows]
+        else:
+            data = read_history(since=request.args.get("since", type=float),
+                                until=request.args.get("until", type=float),
+                                limit=request.args.get("limit", 10, type=int))
+            data = [{"time": time, "stress": stress} for time, stress in data]
 
         complete_data = {
             "history": data,
             "biometrics": biometrics,
-            "prediction": gen_prediction()
+            "prediction": gen_prediction(user)
         }
         return jsonify(complete_data)
     except FileNotFoundError:
         return jsonify({"error": "History file not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/rules", methods=["GET"])
+def publish_delta(**delta):
+    """
+    Pushes new data to /stream subscribers. The prediction is added on the
+    publisher thread, so the webhook doesn't wait for it.
+    """
+    delta_publisher.publish(delta)
+
+
+def delta_extras():
+    return {"prediction": gen_prediction(), "rules_version": rules_version}
+
+
+def publish_history(rows):
+    global current_stress
+    current_stress = rows[-1][1]
+    history_pyramid.extend(rows)
+    publish_delta(history=[{"time": time, "stress": stress}
+                           for time, stress in rows])
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@routes.route("/stream", methods=["GET"])
+def stream():
+    """
+    Server-Sent Events feed for the dashboard. Sends a full snapshot on
+    connect, then a delta only when a new EMG point, Terra webhook or rule
+    change arrives.
+    """
+    subscription = event_broker.subscribe()
+    snapshot = stream_snapshot()
+
+    def generate():
+        try:
+            yield format_sse("snapshot", snapshot)
+            yield from subscription.messages()
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+
+def stream_snapshot():
+    """What a /stream client gets on connect (shared with asgi.py)."""
+    return {
+        "history": [{"time": time, "stress": stress} for time, stress in read_history()],
+        "biometrics": get_bio_data(),
+        "prediction": gen_prediction(),
+        "rules": read_monitoring_rules(),
+        "rules_version": rules_version
+    }
+
+
+@routes.route("/stats", methods=["GET"])
+def get_stats():
+    return jsonify({
+        "prediction_cache": prediction_cache.stats(),
+        "streaming_predictions": {"users": streaming_predictions.user_count(),
+                                  "samples": streaming_predictions.samples,
+                                  "dropped": streaming_predictions.dropped},
+        "users": user_biometrics.user_count(),
+        "biometrics_writer": biometrics_writer.stats(),
+        "stream_subscribers": event_broker.subscriber_count(),
+        "llm": llm_client.stats(),
+        "conversations": conversations.stats()
+    })
+
+
+@routes.route("/rules", methods=["GET"])
 def get_rules():
     try:
         rules = read_monitoring_rules()
@@ -191,91 +344,159 @@ def get_rules():
 # --- Prompt Template Setup ---
 
 
-system_prompt_template = PromptTemplate(
-    input_variables=[],
-    template=(
-        "You are a helpful assistant that helps users set up actions on their computer. When users tell you about their problems or needs or ask for advice, you should suggest some actions you could set up to monitor and help them. Discuss this new monitoring rule with the user and ask them to confirm it. Once they do, you can create it using the 'create_monitoring_rule' tool. Describe the rule you will create with bullet points and use markdown if needed, don't show the non-cute fields to the user."
-        "You should talk like an southern mother, always caring and helpful. You should also be a bit playful and cute, but also very responsible and reliable. Talk stylized, use emojis and cute language."
-    )
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that helps users set up actions on their computer. When users tell you about their problems or needs or ask for advice, you should suggest some actions you could set up to monitor and help them. Discuss this new monitoring rule with the user and ask them to confirm it. Once they do, you can create it using the 'create_monitoring_rule' tool. Describe the rule you will create with bullet points and use markdown if needed, don't show the non-cute fields to the user."
+    "You should talk like an southern mother, always caring and helpful. You should also be a bit playful and cute, but also very responsible and reliable. Talk stylized, use emojis and cute language."
 )
 
 # --- Tool-calling Agent Setup Using LangGraph ---
 
-# Define a Pydantic model for tool input.
-
-
-# Define a custom tool that creates a monitoring rule from three parameters.
-
-
-class MonitoringActionTool(BaseTool):
-    name: str = "create_monitoring_rule"
-    description: str = (
-        "Creates a monitoring rule. Provide three parameters: "
-        "condition (str), actions (list of str), and priority (int)."
-        """The conditions you can use are the current time, current stress level, and what is on the user's screen. you can also mention multistep conditions or conditions over time to describe when and why actions are to be triggered in this field.
-        Available Action Types:
-        - SET_WEBSITE: <the url of the website to change the current tab to>
-        - CLOSE_TAB: <closes current tab>
-        - ORDER_FOOD: <dish to order and restaurant to order from>
-        - TEXT_FRIEND: <the phone number and message to text in the form: number|message>
-        - MATCHA: <opens the Ekkomi matcha website>
-        - MASSAGE: <prescribes a massage>
-        - MUSIC: <jazz/lofi/pop>
-        - NOTIFICATION: <text of notification to user>
-        - BRIGHTNESS: <brightness 1-100>
-        - COLOR: <kelvin of screen temperature>"""
-    )
-
-    def _run(self, tool_input: MonitoringRule) -> str:
-        tool_input = MonitoringRule(**tool_input)
-        return create_monitoring_rule(tool_input)
-
-    async def _arun(self, tool_input: Dict) -> str:
-        raise NotImplementedError("Async mode not supported for this tool.")
-
-
-# Set up the chat model and create the agent.
-model = ChatOpenAI(model="gpt-4", temperature=0)
-tools = [MonitoringActionTool()]
-
-# Create a stateless React-style tool-calling agent.
-# (Note: We no longer pass the prompt here. Instead, we'll prepend the system prompt on each call.)
-agent = create_react_agent(model, tools)
+# Requests go through the shared pooled client (see llm_client.py).
+llm_client = shared_client()
+conversations = ConversationStore()
+# Built by get_agent() on the first /ask; benchmarks may assign their own.
+agent = None
+_agent_lock = threading.Lock()
+_system_message = None
+
+
+def build_agent(model):
+    """A stateless React-style tool-calling agent around `model`."""
+    from langchain_core.tools import BaseTool
+    from langgraph.prebuilt import create_react_agent
+
+    # Define a custom tool that creates a monitoring rule from three parameters.
+    class MonitoringActionTool(BaseTool):
+        name: str = "create_monitoring_rule"
+        description: str = (
+            "Creates a monitoring rule. Provide three parameters: "
+            "condition (str), actions (list of str), and priority (int)."
+            """The conditions you can use are the current time, current stress level, and what is on the user's screen. you can also mention multistep conditions or conditions over time to describe when and why actions are to be triggered in this field.
+            Available Action Types:
+            - SET_WEBSITE: <the url of the website to change the current tab to>
+            - CLOSE_TAB: <closes current tab>
+            - ORDER_FOOD: <dish to order and restaurant to order from>
+            - TEXT_FRIEND: <the phone number and message to text in the form: number|message>
+            - MATCHA: <opens the Ekkomi matcha website>
+            - MASSAGE: <prescribes a massage>
+            - MUSIC: <jazz/lofi/pop>
+            - NOTIFICATION: <text of notification to user>
+            - BRIGHTNESS: <brightness 1-100>
+            - COLOR: <kelvin of screen temperature>"""
+        )
+
+        def _run(self, tool_input: MonitoringRule) -> str:
+            tool_input = MonitoringRule(**tool_input)
+            return create_monitoring_rule(tool_input)
+
+        async def _arun(self, tool_input: Dict) -> str:
+            # Writing rules.json is blocking file IO, so keep it off the event loop.
+            return await asyncio.to_thread(self._run, tool_input)
+
+    # (Note: We no longer pass the prompt here. Instead, we'll prepend the system prompt on each call.)
+    return create_react_agent(model, [MonitoringActionTool()])
+
+
+def get_agent():
+    """The chat agent, built on first use."""
+    global agent
+    with _agent_lock:
+        if agent is None:
+            agent = build_agent(llm_client.chat_model(model="gpt-4", temperature=0))
+        return agent
+
+
+def system_message():
+    """
+    The system prompt is static, so every conversation starts with this same
+    message object, giving the provider a stable prefix to cache.
+    """
+    global _system_message
+    if _system_message is None:
+        from langchain_core.messages import SystemMessage
+        _system_message = SystemMessage(content=SYSTEM_PROMPT)
+    return _system_message
 
 # --- /ask Endpoint: Invoking the Agent and Streaming Results ---
 
 
-@app.route("/ask", methods=["POST"])
+@routes.route("/ask", methods=["POST"])
 def handle_query():
     """
-    Expects a JSON payload with a "history" field – an array of messages,
-    e.g.:
+    Expects a JSON payload with a "conversation_id" and the new "message".
+    When the server doesn't know the conversation (409), the client sends
+    the full "history" instead – an array of messages, e.g.:
       [
           {"sender": "user", "message": "My system is acting weird"},
           {"sender": "assistant", "message": "Tell me more about the issue."}
       ]
+    A payload with only "history" is answered statelessly, as before.
     """
     data = request.json
-    history = data.get("history", [])
+    try:
+        messages = prepare_chat(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if messages is None:
+        return jsonify({"error": "Unknown conversation, send the full history"}), 409
+
+    def generate():
+        reply = []
+        # Use the agent's built-in streaming functionality.
+        for chunk, metadata in get_agent().stream({"messages": messages}, stream_mode="messages"):
+            if hasattr(chunk, "content"):
+                text = chunk.content
+            else:
+                text = str(chunk)
+            reply.append(text)
+            yield text
+        finish_chat(data, messages, "".join(reply))
+    return Response(generate(), mimetype='text/plain')
+
+
+def prepare_chat(data):
+    """
+    The agent's input messages for an /ask payload (shared with asgi.py), or
+    None if it names a conversation the server no longer has. Raises
+    ValueError for a payload with neither a "message" nor a "history".
+    """
+    from langchain_core.messages import HumanMessage
+
+    conversation_id = data.get("conversation_id")
+    history = data.get("history")
+    if history is not None or conversation_id is None:
+        return build_chat_messages(history or [])
+    if "message" not in data:
+        raise ValueError('Send the new "message" or the full "history"')
+    return conversations.with_turn(conversation_id, HumanMessage(content=data["message"]))
+
+
+def finish_chat(data, messages, reply):
+    """
+    Stores the turn once its reply has streamed completely, so the next turn
+    doesn't have to send it back. Not called if the stream fails or the
+    client goes away, which leaves the conversation as it was.
+    """
+    from langchain_core.messages import AIMessage
+
+    if data.get("conversation_id") is not None:
+        conversations.add_turn(data["conversation_id"], messages, AIMessage(content=reply))
+
+
+def build_chat_messages(history):
+    """Turns the client's chat history into agent messages."""
+    from langchain_core.messages import HumanMessage, AIMessage
 
     # Reconstruct conversation as a list of messages.
     messages = []
     # Prepend the system message created from our prompt template.
-    messages.append(SystemMessage(content=system_prompt_template.format()))
+    messages.append(system_message())
     for chat in history:
         if chat["sender"] == "user":
             messages.append(HumanMessage(content=chat["message"]))
         else:
             messages.append(AIMessage(content=chat["message"]))
-
-    def generate():
-        # Use the agent's built-in streaming functionality.
-        for chunk, metadata in agent.stream({"messages": messages}, stream_mode="messages"):
-            if hasattr(chunk, "content"):
-                yield chunk.content
-            else:
-                yield str(chunk)
-    return Response(generate(), mimetype='text/plain')
+    return messages
 
 # --- Background Thread for Updating History (unchanged) ---
 
@@ -304,57 +525,57 @@ def add_random_number():
     # return samples_to_read
 
 
-def get_bio_data():
-    with open(HEART_RATE_FILE, "r") as file:
-        heart_rate = [float(x.strip()) for x in file.readlines()[-20:]]
-        heart_rate = [{"time": i, "rate": rate}
-                      for i, rate in enumerate(heart_rate)]
+def get_bio_data(user=None):
+    buffers = biometrics_for(user)
+    return buffers.snapshot() if buffers is not None else None
 
-    with open(BLOOD_PRESSURE_FILE, "r") as file:
-        blood_pressure = [float(x)
-                          for x in file.readlines()[-1].strip().split(",")]
 
-    with open(BODY_TEMPERATURE_FILE, "r") as file:
-        body_temperature = float(file.readlines()[-1].strip())
-
-    biometrics = {
-        "heart_rate": heart_rate,
-        "blood_pressure_high": blood_pressure[0],
-        "blood_pressure_low": blood_pressure[1],
-        "body_temperature": body_temperature
-    }
-
-    return biometrics
+def ingest_sample(user_id, heart_rate, systolic_bp, diastolic_bp, body_temperature):
+    """Stores one reduced sample; shared by the Terra webhook and the simulator."""
+    stress = current_stress
+    if user_id is None or user_id == DEFAULT_USER:
+        generation = biometric_cache.record(heart_rate, systolic_bp, diastolic_bp,
+                                            body_temperature, stress)
+        streaming_predictions.push(DEFAULT_USER, generation, stress, heart_rate,
+                                   systolic_bp, body_temperature)
+        publish_delta(biometrics=get_bio_data())
+    else:
+        user_id = str(user_id)
+        generation = user_biometrics.record(user_id, heart_rate, systolic_bp,
+                                            diastolic_bp, body_temperature, stress)
+        streaming_predictions.push(user_id, generation, stress, heart_rate,
+                                   systolic_bp, body_temperature)
 
 
-@app.route("/consumeTerraWebhook", methods=["POST"])
+@routes.route("/consumeTerraWebhook", methods=["POST"])
 def consume_terra_webhook() -> flask.Response:
-    body = request.get_json()
+    try:
+        # Decodes with msgspec/orjson when installed and reduces every sample
+        # of every data entry with NumPy (see terra_payload.py).
+        summary = terra_payload.parse_webhook(request.get_data())
+    except ValueError as e:
+        return jsonify({"error": f"Invalid payload: {e}"}), 400
+    user_id = summary["user_id"]
     _LOGGER.info(
         "Received webhook for user %s of type %s",
-        body.get("user", {}).get("user_id"),
-        body["type"])
-
-    avg_heart_rate = body["data"][0]["heart_data"]["heart_rate_data"]["summary"]["avg_hr_bpm"]
+        user_id,
+        summary["type"])
 
-    avg_systolic_bp = sum(bp["systolic_bp"] for bp in body["data"][0]["blood_pressure_data"]
-                          ["blood_pressure_samples"]) / len(body["data"][0]["blood_pressure_data"]["blood_pressure_samples"])
-    avg_diastolic_bp = sum(bp["diastolic_bp"] for bp in body["data"][0]["blood_pressure_data"]
-                           ["blood_pressure_samples"]) / len(body["data"][0]["blood_pressure_data"]["blood_pressure_samples"])
-
-    avg_body_temperature = sum(temp["temperature_celsius"] for temp in body["data"][0]["temperature_data"]
-                               ["body_temperature_samples"]) / len(body["data"][0]["temperature_data"]["body_temperature_samples"])
-
-    with open("heart_rate.txt", "a") as file:
-        file.write(f"{avg_heart_rate}\n")
+    missing = [signal for signal in terra_payload.SIGNALS if summary[signal] is None]
+    if missing:
+        # Other Terra event types (activity, sleep, ...) have nothing we store
+        _LOGGER.info("Ignoring webhook without %s", ", ".join(missing))
+        return flask.Response(status=200)
 
-    with open("blood_pressure.txt", "a") as file:
-        file.write(f"{avg_systolic_bp}, {avg_diastolic_bp}\n")
+    avg_heart_rate = summary["heart_rate"]["mean"]
+    avg_systolic_bp = summary["systolic_bp"]["mean"]
+    avg_diastolic_bp = summary["diastolic_bp"]["mean"]
+    avg_body_temperature = summary["body_temperature"]["mean"]
 
-    with open("body_temperature.txt", "a") as file:
-        file.write(f"{avg_body_temperature}\n")
+    ingest_sample(user_id, avg_heart_rate, avg_systolic_bp,
+                  avg_diastolic_bp, avg_body_temperature)
 
-    # terra.check_terra_signature(request.get_data().decode("utf-8"), request.headers['terra-signature'])
+    # terra_client().check_terra_signature(request.get_data().decode("utf-8"), request.headers['terra-signature'])
     verified = True
     if verified:
         return flask.Response(status=200)
@@ -362,70 +583,65 @@ def consume_terra_webhook() -> flask.Response:
         return flask.Response(status=403)
 
 
-def generate_fake_data():
-    """Simulate sensor data and send to /consumeTerraWebhook every 30 seconds."""
-
-    stress_levels = ["Low stress", "Normal but not low stress",
-                     "Moderately high stress", "Very High stress", "EXTREMELY high stress"]
-
-    while True:
-        with open("../stress.txt", "r") as file:
-            stress = file.readlines()[-1].strip()
-            stress_level = stress_levels.index(stress)
-        fake_data = {
-            "user": {"user_id": "test_user"},
-            "type": "health_data",
-            "data": [{
-                "heart_data": {
-                    "heart_rate_data": {
-                        "summary": {
-                            # Random heart rate
-                            "avg_hr_bpm": random.randint(70 + stress_level * 10, 120 + stress_level * 10)
-                        }
-                    }
-                },
-                "blood_pressure_data": {
-                    "blood_pressure_samples": [
-                        {"systolic_bp": random.randint(100 + stress_level * 5, 130 + stress_level * 5),
-                         "diastolic_bp": random.randint(60 + stress_level * 5, 80 + stress_level * 5)}
-                    ]
-                },
-                "temperature_data": {
-                    "body_temperature_samples": [
-                        {"temperature_celsius": round(random.uniform(
-                            36.0 + stress_level * 0.1, 37.0 + stress_level * 0.1), 1)}  # Normal body temp range
-                    ]
-                },
-                "metadata": {
-                    # Current timestamp in UTC
-                    "end_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-                }
-            }]
-        }
-
-        # Send data to the webhook endpoint
-        try:
-            response = requests.post(
-                "http://localhost:5000/consumeTerraWebhook", json=fake_data)
-            if response.status_code == 200:
-                print("✅ Fake data sent successfully!")
-                print("Stress: ", stress_level)
-
-            else:
-                print(
-                    f"❌ Failed to send data: {response.status_code} - {response.text}")
-        except requests.exceptions.RequestException as e:
-            print(f"🚨 Error sending fake data: {e}")
+app = None
+simulator = None
 
-        time.sleep(3)  # Wait 30 seconds before sending the next request
 
+def create_app():
+    """
+    Loads the stored samples, starts the background threads (write-behind
+    writer, prediction batcher, delta publisher, history watcher and, if
+    SIMULATOR is set, the simulator) and returns the Flask app. Importing
+    this module starts nothing and builds no app, so there is no thread-less
+    app to serve by mistake: run it with `python server.py`, asgi.py, or
+    `flask --app server run`, which finds this factory. Calling it again
+    just returns the app.
+    """
+    global app, simulator, history_source, current_stress
+    if app is not None:
+        return app
+    app = Flask(__name__)
+    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+    app.config['CORS_HEADERS'] = 'Content-Type'
+    app.register_blueprint(routes)
+
+    # Prefer the memory-mapped binary log when the EMG reader is writing one
+    # and it has everything history.txt has
+    if os.path.exists(HISTORY_LOG_FILE):
+        if sample_log.covers(history_store):
+            history_source = sample_log
+        else:
+            print(f"{HISTORY_LOG_FILE} is missing samples from {HISTORY_FILE}, reading {HISTORY_FILE}. "
+                  f"Run `python sample_log.py {HISTORY_FILE} {HISTORY_LOG_FILE}` to convert it.")
+    try:
+        # The watcher below carries on from where this read ended
+        rows, history_offset = history_source.tail_with_offset(100000)
+    except FileNotFoundError:
+        rows, history_offset = [], 0
+    history_pyramid.extend(rows)
+    if rows:
+        current_stress = rows[-1][1]
+    biometric_cache.load(stress=current_stress)
+    os.makedirs(USER_BIOMETRICS_DIR, exist_ok=True)
+    user_biometrics.load(stress=current_stress)
+    biometrics_writer.start()
+    atexit.register(biometrics_writer.close)
+    prediction_batcher.start()
+    delta_publisher.start()
+    # Synthetic or replayed samples fed straight into ingest_sample, off
+    # unless SIMULATOR is set (see simulator.py)
+    simulator = simulator_from_env(ingest_sample, DEFAULT_USER)
+    if simulator is not None:
+        simulator.start()
+    threading.Thread(target=watch_history,
+                     args=(history_source, publish_history, history_offset),
+                     daemon=True).start()
+    return app
 
-# Start the background thread
-threading.Thread(target=generate_fake_data, daemon=True).start()
 
 if __name__ == "__main__":
     # Uncomment the following lines if you want to run the background thread.
     # thread = Thread(target=add_random_number)
     # thread.start()
 
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    create_app().run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,159 @@
+import csv
+import os
+import random
+import sys
+import threading
+import time
+
+STRESS_LEVELS = ["Low stress", "Normal but not low stress",
+                 "Moderately high stress", "Very High stress", "EXTREMELY high stress"]
+
+RECORDING_FIELDS = ["timestamp", "user_id", "heart_rate", "systolic_bp", "diastolic_bp", "body_temperature"]
+
+
+def synthetic_sample(stress_level, rng):
+    """One sample with the same distributions generate_fake_data posted."""
+    return (rng.randint(70 + stress_level * 10, 120 + stress_level * 10),
+            rng.randint(100 + stress_level * 5, 130 + stress_level * 5),
+            rng.randint(60 + stress_level * 5, 80 + stress_level * 5),
+            round(rng.uniform(36.0 + stress_level * 0.1, 37.0 + stress_level * 0.1), 1))
+
+
+def read_stress_level(path):
+    """Index of the EMG reader's current stress category, or None."""
+    try:
+        with open(path, "r") as file:
+            return STRESS_LEVELS.index(file.readlines()[-1].strip())
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def read_recording(path):
+    """Rows of a recording CSV (see RECORDING_FIELDS), in file order."""
+    with open(path, "r", newline="") as file:
+        return [(float(row["timestamp"]), row["user_id"], float(row["heart_rate"]),
+                 float(row["systolic_bp"]), float(row["diastolic_bp"]), float(row["body_temperature"]))
+                for row in csv.DictReader(file)]
+
+
+def convert_legacy_files(heart_rate_file, blood_pressure_file, body_temperature_file,
+                         out_path, user_id, interval=3.0):
+    """
+    Writes the single-user text files as a recording. They carry no
+    timestamps, so samples are spaced `interval` seconds apart.
+    """
+    with open(heart_rate_file) as hr, open(blood_pressure_file) as bp, \
+            open(body_temperature_file) as temp, open(out_path, "w", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(RECORDING_FIELDS)
+        written = 0
+        for i, (heart_rate, pressure, temperature) in enumerate(zip(hr, bp, temp)):
+            try:
+                systolic, diastolic = (float(x) for x in pressure.split(","))
+                writer.writerow([i * interval, user_id, float(heart_rate), systolic, diastolic,
+                                 float(temperature)])
+                written += 1
+            except ValueError:
+                continue
+    return written
+
+
+class Simulator:
+    """
+    Feeds samples straight into the ingestion path, without HTTP.
+
+    "synthetic" generates one sample per user every `interval` seconds; the
+    first user follows the EMG reader's stress.txt like the old fake-data
+    thread did, the others random-walk through the stress levels. "replay"
+    plays a recording back `speed` times faster than it was recorded.
+    `ingest(user_id, heart_rate, systolic_bp, diastolic_bp, body_temperature)`
+    is called for every sample. A seed makes synthetic runs reproducible.
+    """
+
+    def __init__(self, ingest, mode="synthetic", users=1, first_user="test_user",
+                 interval=3.0, speed=1.0, recording=None, stress_file="../stress.txt", seed=None):
+        if mode not in ("synthetic", "replay"):
+            raise ValueError(f"Unknown simulator mode: {mode}")
+        if mode == "replay" and recording is None:
+            raise ValueError("Replay needs a recording file")
+        self.ingest = ingest
+        self.mode = mode
+        self.user_ids = [first_user] + [f"sim-user-{i:05d}" for i in range(1, users)]
+        self.interval = interval
+        self.speed = speed
+        self.recording = recording
+        self.stress_file = stress_file
+        self.samples = 0
+        self._rng = random.Random(seed)
+        self._stress = [self._rng.randrange(len(STRESS_LEVELS)) for _ in self.user_ids]
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, ticks=None):
+        """Runs until stopped, or for `ticks` rounds of synthetic samples."""
+        if self.mode == "replay":
+            self.replay()
+            return
+        tick = 0
+        while not self._stop.is_set() and (ticks is None or tick < ticks):
+            started = time.monotonic()
+            self.tick()
+            tick += 1
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def tick(self):
+        """One synthetic sample for every user."""
+        file_level = read_stress_level(self.stress_file) if self.stress_file else None
+        for i, user_id in enumerate(self.user_ids):
+            if i == 0 and file_level is not None:
+                level = file_level
+            else:
+                level = self._stress[i] = min(len(STRESS_LEVELS) - 1,
+                                              max(0, self._stress[i] + self._rng.choice((-1, 0, 0, 1))))
+            self.ingest(user_id, *synthetic_sample(level, self._rng))
+            self.samples += 1
+
+    def replay(self):
+        rows = read_recording(self.recording)
+        if not rows:
+            return
+        start = time.monotonic()
+        first = rows[0][0]
+        for timestamp, user_id, *values in rows:
+            delay = (timestamp - first) / self.speed - (time.monotonic() - start)
+            if delay > 0 and self._stop.wait(delay):
+                return
+            self.ingest(user_id, *values)
+            self.samples += 1
+
+
+def simulator_from_env(ingest, first_user):
+    """
+    The simulator configured by SIMULATOR (off, synthetic or replay),
+    SIMULATOR_USERS, SIMULATOR_INTERVAL, SIMULATOR_SPEED, SIMULATOR_FILE and
+    SIMULATOR_SEED, or None when it is off (the default).
+    """
+    mode = os.getenv("SIMULATOR", "off")
+    if mode == "off":
+        return None
+    seed = os.getenv("SIMULATOR_SEED")
+    return Simulator(ingest, mode=mode,
+                     users=int(os.getenv("SIMULATOR_USERS", 1)),
+                     first_user=first_user,
+                     interval=float(os.getenv("SIMULATOR_INTERVAL", 3.0)),
+                     speed=float(os.getenv("SIMULATOR_SPEED", 1.0)),
+                     recording=os.getenv("SIMULATOR_FILE"),
+                     seed=int(seed) if seed is not None else None)
+
+
+if __name__ == "__main__":
+    # Usage: python simulator.py recording.csv   (from the single-user text files)
+    count = convert_legacy_files("heart_rate.txt", "blood_pressure.txt", "body_temperature.txt",
+                                 sys.argv[1], user_id=os.getenv("DEFAULT_TERRA_USER", "test_user"))
+    print(f"Wrote {count} samples to {sys.argv[1]}")
@@ -0,0 +1,155 @@
+import json
+from typing import List, Optional
+
+import numpy as np
+
+# Fastest available decoder: msgspec decodes straight into the typed schema
+# below and skips fields we don't use; orjson and json build plain dicts.
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SIGNALS = ("heart_rate", "systolic_bp", "diastolic_bp", "body_temperature")
+PERCENTILES = (5, 50, 95)
+
+
+if msgspec is not None:
+    class HeartRateSample(msgspec.Struct):
+        bpm: float
+
+    class HeartRateSummary(msgspec.Struct):
+        avg_hr_bpm: Optional[float] = None
+
+    class HeartRateDetailed(msgspec.Struct):
+        hr_samples: List[HeartRateSample] = []
+
+    class HeartRateData(msgspec.Struct):
+        summary: Optional[HeartRateSummary] = None
+        detailed: Optional[HeartRateDetailed] = None
+
+    class HeartData(msgspec.Struct):
+        heart_rate_data: Optional[HeartRateData] = None
+
+    class BloodPressureSample(msgspec.Struct):
+        systolic_bp: float
+        diastolic_bp: float
+
+    class BloodPressureData(msgspec.Struct):
+        blood_pressure_samples: List[BloodPressureSample] = []
+
+    class TemperatureSample(msgspec.Struct):
+        temperature_celsius: float
+
+    class TemperatureData(msgspec.Struct):
+        body_temperature_samples: List[TemperatureSample] = []
+
+    class DataEntry(msgspec.Struct):
+        heart_data: Optional[HeartData] = None
+        blood_pressure_data: Optional[BloodPressureData] = None
+        temperature_data: Optional[TemperatureData] = None
+
+    class TerraUser(msgspec.Struct):
+        user_id: Optional[str] = None
+
+    class TerraPayload(msgspec.Struct):
+        type: str
+        user: TerraUser = msgspec.field(default_factory=TerraUser)
+        data: List[DataEntry] = []
+
+    _decoder = msgspec.json.Decoder(TerraPayload)
+
+
+def decode(raw):
+    """Decodes a webhook body with the fastest available decoder."""
+    if msgspec is not None:
+        try:
+            return _decoder.decode(raw)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e))
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _samples_from_structs(payload):
+    heart_rate, summaries, pressure, temperature = [], [], [], []
+    for entry in payload.data:
+        hr = entry.heart_data and entry.heart_data.heart_rate_data
+        if hr is not None:
+            if hr.detailed is not None:
+                heart_rate.extend(sample.bpm for sample in hr.detailed.hr_samples)
+            if hr.summary is not None and hr.summary.avg_hr_bpm is not None:
+                summaries.append(hr.summary.avg_hr_bpm)
+        if entry.blood_pressure_data is not None:
+            pressure.extend((sample.systolic_bp, sample.diastolic_bp)
+                            for sample in entry.blood_pressure_data.blood_pressure_samples)
+        if entry.temperature_data is not None:
+            temperature.extend(sample.temperature_celsius
+                               for sample in entry.temperature_data.body_temperature_samples)
+    user_id = payload.user.user_id
+    return payload.type, user_id, heart_rate or summaries, pressure, temperature
+
+
+def _samples_from_dicts(payload):
+    heart_rate, summaries, pressure, temperature = [], [], [], []
+    for entry in payload.get("data", []):
+        hr = (entry.get("heart_data") or {}).get("heart_rate_data") or {}
+        heart_rate.extend(sample["bpm"] for sample in (hr.get("detailed") or {}).get("hr_samples", []))
+        summary = (hr.get("summary") or {}).get("avg_hr_bpm")
+        if summary is not None:
+            summaries.append(summary)
+        pressure.extend((sample["systolic_bp"], sample["diastolic_bp"]) for sample in
+                        (entry.get("blood_pressure_data") or {}).get("blood_pressure_samples", []))
+        temperature.extend(sample["temperature_celsius"] for sample in
+                           (entry.get("temperature_data") or {}).get("body_temperature_samples", []))
+    user_id = (payload.get("user") or {}).get("user_id")
+    return payload["type"], user_id, heart_rate or summaries, pressure, temperature
+
+
+def describe(values):
+    """mean/min/max/percentiles of a 1-D array, or None if it is empty."""
+    if not len(values):
+        return None
+    percentiles = np.percentile(values, PERCENTILES)
+    stats = {"count": int(len(values)), "mean": float(values.mean()),
+             "min": float(values.min()), "max": float(values.max())}
+    stats.update({f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)})
+    return stats
+
+
+def reduce_payload(payload):
+    """
+    Summarizes every sample of every data entry in a decoded webhook.
+
+    Each signal is copied into one NumPy array, so the statistics are a few
+    vectorized passes however many samples the payload has. Detailed heart
+    rate samples are used when present, otherwise each entry's average.
+    Returns {"type", "user_id", <signal>: stats or None for each SIGNALS}.
+    """
+    extract = _samples_from_dicts if isinstance(payload, dict) else _samples_from_structs
+    payload_type, user_id, heart_rate, pressure, temperature = extract(payload)
+    pressure = np.array(pressure, dtype=np.float64).reshape(-1, 2)
+    return {
+        "type": payload_type,
+        "user_id": user_id,
+        "heart_rate": describe(np.array(heart_rate, dtype=np.float64)),
+        "systolic_bp": describe(pressure[:, 0]),
+        "diastolic_bp": describe(pressure[:, 1]),
+        "body_temperature": describe(np.array(temperature, dtype=np.float64))
+    }
+
+
+def parse_webhook(raw):
+    """Decodes and reduces a raw webhook body, raising ValueError if it is malformed."""
+    payload = decode(raw)
+    try:
+        return reduce_payload(payload)
+    except (KeyError, TypeError, AttributeError) as e:
+        # Only reachable without msgspec, whose schema catches these on decode
+        raise ValueError(f"Missing or malformed field: {e}")
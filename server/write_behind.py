@@ -0,0 +1,147 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+FSYNC_POLICIES = ("never", "batch", "interval")
+
+
+class WriteBehindWriter:
+    """
+    Appends lines to files from a single background thread.
+
+    Callers enqueue (path, line) and return immediately; the writer drains
+    the queue in batches of up to `max_batch` lines or `max_delay` seconds,
+    whichever comes first, and does one write and flush per file per batch.
+    Lines for the same file keep their order. The fsync policy decides how
+    much a crash can lose: "never" leaves it to the OS, "batch" syncs every
+    flushed file, "interval" syncs at most every `fsync_interval` seconds,
+    and within `fsync_interval` of the last write even if no more come.
+    When the queue is full, writers block rather than drop samples.
+    """
+
+    def __init__(self, max_batch=500, max_delay=0.2, fsync="interval",
+                 fsync_interval=1.0, max_queue=100000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.batches = 0
+        self.lines = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._files = {}
+        # Files written since the last fsync, for the "interval" policy
+        self._dirty = set()
+        self._sync_lock = threading.Lock()
+        self._last_sync = time.monotonic()
+        self._flush_ms = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Starts the writer thread; write() does this itself if nobody has."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return self
+
+    def write(self, path, line):
+        if self._thread is None:
+            self.start()
+        self._queue.put((path, line))
+
+    def flush(self):
+        """Blocks until everything queued so far is on disk (per the policy)."""
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        with self._sync_lock:
+            for path in self._dirty:
+                os.fsync(self._files[path].fileno())
+            self._dirty.clear()
+            for file in self._files.values():
+                file.close()
+            self._files = {}
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self._idle_timeout())]
+            except queue.Empty:
+                # Nothing more came: sync what the last batches left dirty
+                try:
+                    self._sync_dirty()
+                except Exception as e:
+                    print("Error syncing files:", e)
+                continue
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                print("Error writing batch:", e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        by_path = {}
+        for path, line in batch:
+            by_path.setdefault(path, []).append(line)
+
+        for path, lines in by_path.items():
+            file = self._files.get(path)
+            if file is None:
+                file = self._files[path] = open(path, "a")
+            file.write("".join(lines))
+            file.flush()
+            if self.fsync == "batch":
+                os.fsync(file.fileno())
+            elif self.fsync == "interval":
+                self._dirty.add(path)
+        if self.fsync == "interval" and time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync_dirty()
+
+        with self._lock:
+            self.batches += 1
+            self.lines += len(batch)
+            self._flush_ms.append((time.perf_counter() - started) * 1000)
+
+    def _idle_timeout(self):
+        """How long the writer may wait for lines before dirty files are due a sync."""
+        if not self._dirty:
+            return None
+        return max(0.0, self._last_sync + self.fsync_interval - time.monotonic())
+
+    def _sync_dirty(self):
+        with self._sync_lock:
+            for path in self._dirty:
+                os.fsync(self._files[path].fileno())
+            self._dirty.clear()
+            self._last_sync = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            flush_ms = sorted(self._flush_ms)
+            batches, lines = self.batches, self.lines
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": batches,
+            "lines": lines,
+            "fsync": self.fsync,
+            "flush_ms_p50": flush_ms[len(flush_ms) // 2] if flush_ms else None,
+            "flush_ms_max": flush_ms[-1] if flush_ms else None
+        }
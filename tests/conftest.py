@@ -0,0 +1,11 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(ROOT, "server")
+
+# agent.py and rule_filter.py live at the root; server/'s modules import
+# each other by bare name, as they do when run from server/
+for path in (ROOT, SERVER_DIR):
+    if path not in sys.path:
+        sys.path.append(path)
@@ -0,0 +1,29 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pyautogui")
+
+from agent import ActionExecutor, ActionHistory, ActionType, MonitorAction  # noqa: E402
+
+
+def test_slow_actions_do_not_hold_up_other_types():
+    release = threading.Event()
+    done = threading.Event()
+
+    def run_action(action):
+        if action.action_type == ActionType.TEXT_FRIEND:
+            release.wait(5)
+        else:
+            done.set()
+
+    executor = ActionExecutor(run_action, ActionHistory())
+    for _ in range(8):
+        executor.submit(MonitorAction(action_type=ActionType.TEXT_FRIEND, value="1|hi", reasoning=""))
+    time.sleep(0.1)
+    executor.submit(MonitorAction(action_type=ActionType.NOTIFICATION, value="hi", reasoning=""))
+    try:
+        assert done.wait(1)
+    finally:
+        release.set()
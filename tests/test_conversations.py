@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+from conversations import ConversationStore
+
+
+def message(content):
+    return SimpleNamespace(content=content)
+
+
+def test_a_turn_is_only_stored_once_it_has_a_reply():
+    store = ConversationStore()
+    system = message("system")
+    store.start("c", [system])
+
+    question = message("hi")
+    messages = store.with_turn("c", question)
+    assert messages == [system, question]
+    # The stream failed: the next turn doesn't see the unanswered question
+    retry = message("hi again")
+    assert store.with_turn("c", retry) == [system, retry]
+
+    reply = message("hello")
+    store.add_turn("c", store.with_turn("c", retry), reply)
+    assert store.with_turn("c", message("bye"))[:3] == [system, retry, reply]
+
+
+def test_unknown_conversation():
+    store = ConversationStore()
+    assert store.with_turn("missing", message("hi")) is None
+    assert store.stats()["misses"] == 1
@@ -0,0 +1,36 @@
+import threading
+import time
+
+from events import watch_history
+from history_store import HistoryStore
+
+
+def test_watcher_waits_for_the_file_and_reads_all_of_it(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.txt"))
+    received = []
+    threading.Thread(target=watch_history, args=(store, received.extend),
+                     kwargs={"interval": 0.01}, daemon=True).start()
+    time.sleep(0.05)
+    store.append(1000, 1.5, 2)
+    store.append(1001, 2.5, 3)
+    for _ in range(100):
+        if len(received) == 2:
+            break
+        time.sleep(0.01)
+    assert received == [[1000.0, 1.5], [1001.0, 2.5]]
+
+
+def test_watcher_follows_on_from_the_tail(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.txt"))
+    store.append(1000, 1.5, 2)
+    rows, offset = store.tail_with_offset(10)
+    # Appended after the tail was read, before the watcher started
+    store.append(1001, 2.5, 3)
+    received = []
+    threading.Thread(target=watch_history, args=(store, received.extend, offset),
+                     kwargs={"interval": 0.01}, daemon=True).start()
+    for _ in range(100):
+        if received:
+            break
+        time.sleep(0.01)
+    assert rows + received == [[1000.0, 1.5], [1001.0, 2.5]]
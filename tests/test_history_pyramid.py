@@ -0,0 +1,31 @@
+import numpy as np
+
+from history_pyramid import HistoryPyramid
+
+
+def test_query_leaves_out_samples_before_a_gap():
+    pyramid = HistoryPyramid()
+    pyramid.extend([(1000 + i * 0.2, 900.0) for i in range(500)])
+    pyramid.extend([(100000 + i, 10.0) for i in range(3600)])
+
+    rows = pyramid.query(100000, 103600, 20)
+
+    assert rows[0][0] >= 100000
+    assert all(mean == 10.0 and high == 10.0 for _, _, mean, high in rows)
+
+
+def test_query_matches_the_raw_samples():
+    rng = np.random.default_rng(0)
+    times = np.cumsum(rng.exponential(0.5, 20000))
+    values = rng.uniform(0, 100, len(times))
+    pyramid = HistoryPyramid()
+    pyramid.extend(zip(times, values))
+
+    since, until = times[5000], times[-1]
+    rows = pyramid.query(since, until, points=50)
+    assert len(rows) <= 50
+    # The first bucket may start up to one slot (100s at the top level) early
+    assert since - 100 <= rows[0][0]
+    inside = values[times >= rows[0][0]]
+    assert min(low for _, low, _, _ in rows) == inside.min()
+    assert max(high for _, _, _, high in rows) == inside.max()
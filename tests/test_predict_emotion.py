@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from predict_emotion import StreamingPredictor, predict_emotion  # noqa: E402
+
+
+def test_streaming_matches_full_window():
+    rng = np.random.default_rng(0)
+    data = rng.uniform([0, 60, 90, 36.0], [500, 180, 160, 38.5], size=(300, 4))
+    stream = StreamingPredictor()
+    for i, sample in enumerate(data):
+        label = stream.push(*sample)
+        if i < 9:
+            assert label is None
+        else:
+            assert label == predict_emotion(*data[i - 9:i + 1].T)
+
+
+def wait_for(predictions, samples):
+    for _ in range(500):
+        if predictions.samples >= samples:
+            return
+        time.sleep(0.01)
+
+
+def test_streaming_predictions_match_the_buffers_window():
+    from batcher import StreamingPredictions
+    from biometrics import BiometricBuffers
+
+    rng = np.random.default_rng(1)
+    data = rng.uniform([0, 60, 90, 36.0], [500, 180, 160, 38.5], size=(30, 4))
+    buffers = BiometricBuffers()
+    predictions = StreamingPredictions()
+    for stress, bpm, blood_pressure, temperature in data:
+        generation = buffers.append(bpm, blood_pressure, 80, temperature, stress)
+        predictions.push("a", generation, stress, bpm, blood_pressure, temperature)
+    wait_for(predictions, len(data))
+
+    features, generation = buffers.features(10)
+    assert predictions.latest("a", generation) == predict_emotion(*features.T)
+    assert predictions.latest("a", generation - 1) is None
+    assert predictions.latest("b", generation) is None
+
+
+def test_streaming_predictions_restart_after_a_gap():
+    from batcher import StreamingPredictions
+
+    rng = np.random.default_rng(2)
+    data = rng.uniform([0, 60, 90, 36.0], [500, 180, 160, 38.5], size=(22, 4))
+    # Generation 13 never arrives, as if it had been dropped
+    generations = [g for g in range(1, 24) if g != 13]
+    predictions = StreamingPredictions()
+    for generation, sample in zip(generations[:21], data[:21]):
+        predictions.push("a", generation, *sample)
+    wait_for(predictions, 21)
+    # Nine samples since the gap: no window the buffers would agree with
+    assert predictions.latest("a", generations[20]) is None
+
+    predictions.push("a", generations[21], *data[21])
+    wait_for(predictions, 22)
+    assert predictions.latest("a", generations[21]) == predict_emotion(*data[-10:].T)
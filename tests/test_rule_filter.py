@@ -0,0 +1,39 @@
+from datetime import time
+
+import pytest
+
+from rule_filter import CompiledCondition
+
+AFTERNOON = time(14, 0)
+
+
+@pytest.mark.parametrize("condition, stress_level, activity", [
+    ("When user is extremely distracted on youtube", "Very High stress", "Google Chrome - YouTube"),
+    ("running late for a meeting and on slack", "Normal but not low stress", "Slack"),
+    ("when I'm calm, remind me to stretch", "Very High stress", "Finder"),
+    ("when I'm stressed, help me calm down", "Very High stress", "Finder"),
+    ("help me get relaxed in the evening", "Low stress", "Finder"),
+])
+def test_wording_that_is_not_a_predicate_keeps_the_rule(condition, stress_level, activity):
+    now = time(19, 0) if "evening" in condition else AFTERNOON
+    assert CompiledCondition(condition).matches(now, stress_level, activity)
+
+
+@pytest.mark.parametrize("condition, stress", [
+    ("when I'm extremely stressed", (4, 4)),
+    ("extremely high stress", (4, 4)),
+    ("very stressed at work", (3, 4)),
+    ("when stressed on twitter", (2, 4)),
+    ("low stress afternoons", (0, 1)),
+    ("extremely distracted on youtube", None),
+    ("help me calm down", None),
+])
+def test_stress_only_from_stress_wording(condition, stress):
+    assert CompiledCondition(condition).stress == stress
+
+
+def test_compiled_checks_still_rule_out():
+    condition = CompiledCondition("when I'm extremely stressed on youtube at night")
+    assert not condition.matches(time(23, 0), "Low stress", "YouTube")
+    assert not condition.matches(AFTERNOON, "EXTREMELY high stress", "YouTube")
+    assert condition.matches(time(23, 0), "EXTREMELY high stress", "YouTube")
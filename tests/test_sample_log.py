@@ -0,0 +1,36 @@
+from sample_log import SampleLog
+
+
+def test_reads_like_the_text_history(tmp_path):
+    log = SampleLog(str(tmp_path / "history.bin"))
+    log.append(1000, 213.33, 250.0)
+    offset = log.end_offset()
+    log.append(1001, 99.99, 80.0)
+
+    assert log.query() == [[1000.0, 213.33], [1001.0, 99.99]]
+    assert log.read_from(offset) == ([[1001.0, 99.99]], log.end_offset())
+    assert log.read_from(log.end_offset()) == ([], log.end_offset())
+
+
+def test_covers_only_a_converted_history(tmp_path):
+    from history_store import HistoryStore
+    from sample_log import convert
+
+    text = HistoryStore(str(tmp_path / "history.txt"))
+    text.append(1000, 213.33, 250.0)
+    text.append(1001, 99.99, 80.0)
+    log_path = str(tmp_path / "history.bin")
+    log = SampleLog(log_path)
+    # What the EMG reader leaves behind: an empty log next to the old history
+    open(log_path, "wb").close()
+    assert not log.covers(text)
+
+    convert(text.path, log_path)
+    assert log.covers(text)
+    text.append(1002, 50.0, 40.0)
+    assert not log.covers(text)
+    log.append(1002, 50.0, 40.0)
+    assert log.covers(text)
+    # The reader writes the log first; a sample not yet in history.txt is fine
+    log.append(1003, 50.0, 40.0)
+    assert log.covers(text)
@@ -0,0 +1,24 @@
+import os
+import time
+
+from write_behind import WriteBehindWriter
+
+
+def test_interval_fsync_covers_the_last_batch(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+    writer = WriteBehindWriter(max_delay=0.01, fsync="interval", fsync_interval=0.1)
+    path = str(tmp_path / "samples.txt")
+
+    # Within the interval of construction, so not synced when written
+    writer.write(path, "1\n")
+    writer.flush()
+    assert not synced
+    # ...but once the interval has passed, even though nothing else came
+    for _ in range(100):
+        if synced:
+            break
+        time.sleep(0.01)
+    assert synced
+    writer.close()